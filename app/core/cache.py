@@ -0,0 +1,33 @@
+"""
+Small in-process caches shared by the services.
+"""
+
+import time
+from typing import Any, Dict, Hashable, Tuple
+
+
+class TTLCache:
+    """In-process cache whose entries expire after a fixed number of seconds"""
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry and time.monotonic() - entry[0] < self.ttl:
+            return entry[1]
+        return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        # Reset rather than evict one by one; entries are cheap to rebuild
+        if len(self._entries) >= self.max_size:
+            self._entries.clear()
+        self._entries[key] = (time.monotonic(), value)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
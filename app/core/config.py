@@ -57,6 +57,9 @@ class Settings(BaseSettings):
         "OPENCAGE_API_URL", "https://api.opencagedata.com/geocode/v1/json"
     )
 
+    # Positionstack API settings
+    POSITIONSTACK_API_KEY: str = os.getenv("POSITIONSTACK_API_KEY", "")
+
     # Weather API settings
     WEATHER_API_KEY: str = os.getenv("WEATHER_API_KEY", "dummy_key")
 
@@ -148,6 +151,11 @@ class Settings(BaseSettings):
     EMAIL_TEMPLATES_DIR: str = os.getenv("EMAIL_TEMPLATES_DIR", "app/templates/email")
     FRONTEND_URL: str = os.getenv("FRONTEND_URL", "http://localhost:5173")
 
+    # SMS notification settings (SMS is skipped when these are empty)
+    TWILIO_ACCOUNT_SID: str = os.getenv("TWILIO_ACCOUNT_SID", "")
+    TWILIO_AUTH_TOKEN: str = os.getenv("TWILIO_AUTH_TOKEN", "")
+    TWILIO_PHONE_NUMBER: str = os.getenv("TWILIO_PHONE_NUMBER", "")
+
     # AI/LLM settings
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
@@ -159,6 +159,17 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Error stopping task scheduler: {e}")
 
+    # Close pooled connections to notification and geocoding providers
+    from app.services.notification_service import close_http_client
+    from app.services.opencage_geocoding import close_async_client
+    from app.services.positionstack_geocoding import (
+        close_async_client as close_positionstack_client,
+    )
+
+    await close_http_client()
+    await close_async_client()
+    await close_positionstack_client()
+
     logger.info("Application shutdown complete")
 
 
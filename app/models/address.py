@@ -25,5 +25,26 @@ class Address(Base):
     # Relationships - we'll use back_populates instead of declaring hubs here
     # The Hub model will define the relationship with its foreign key
 
+    def get_geocoding_string(self) -> str:
+        """Return the address as a single free-form geocoding query"""
+        parts = [
+            self.street,
+            f"{self.postal_code or ''} {self.city or ''}".strip(),
+            self.state,
+            self.country,
+        ]
+        return ", ".join(part for part in parts if part)
+
+    def get_geocoding_components(self) -> dict:
+        """Return the address parts as Nominatim structured-search parameters"""
+        components = {
+            "street": self.street,
+            "city": self.city,
+            "state": self.state,
+            "postalcode": self.postal_code,
+            "country": self.country,
+        }
+        return {key: value for key, value in components.items() if value}
+
     def __repr__(self):
         return f"<Address(id={self.id}, {self.street}, {self.city}, {self.state})>"
@@ -1,4 +1,13 @@
-from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    String,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -42,6 +51,7 @@ class RideMatchHistory(Base):
 
     __table_args__ = (
         # Ensure a user can only have one match history entry per ride and matched user
+        UniqueConstraint("user_id", "matched_user_id", "ride_id"),
         {"sqlite_autoincrement": True},
     )
 
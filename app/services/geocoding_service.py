@@ -1,16 +1,132 @@
 import json
 import logging
+import re
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 
 import requests
+from requests.adapters import HTTPAdapter
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 
+from app.core.config import settings
 from app.models.address import Address
 from app.models.geocoding_cache import GeocodingCache
 
 logger = logging.getLogger(__name__)
 
+# Number of geocoded addresses written per bulk UPDATE/commit in batch_geocode
+BATCH_COMMIT_SIZE = 10
+
+# Shortest address string worth sending to the geocoding API
+MIN_GEOCODABLE_LENGTH = 5
+
+_DIGITS_ONLY_RE = re.compile(r"^[0-9\s]+$")
+
+# (connect, read) timeouts for Nominatim requests, in seconds
+REQUEST_TIMEOUT = (3.05, 10)
+
+# Nominatim's usage policy allows at most one request per second
+NOMINATIM_REQUESTS_PER_SECOND = 1.0
+
+# Attempts per Nominatim request; throttled (429) and gateway error responses
+# and connection errors are retried, each attempt taking its own token
+REQUEST_ATTEMPTS = 4
+RETRY_BACKOFF_SECONDS = 0.3
+RETRY_STATUSES = (429, 502, 503, 504)
+
+
+class _TokenBucket:
+    """Blocking token-bucket rate limiter shared by all service instances"""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Wait until a token is available and consume it"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated_at) * self.rate
+            )
+            self.updated_at = now
+
+            wait = 0.0
+            if self.tokens < 1:
+                wait = (1 - self.tokens) / self.rate
+                self.tokens = 1.0
+                self.updated_at = now + wait
+            self.tokens -= 1
+
+        if wait > 0:
+            time.sleep(wait)
+
+
+def _create_http_session() -> requests.Session:
+    """Create a pooled session; retries are handled by _get_with_retries"""
+    session = requests.Session()
+    session.headers["User-Agent"] = "RideShareApp/1.0"  # Required by Nominatim
+    session.mount("https://", HTTPAdapter())
+    session.mount("http://", HTTPAdapter())
+    return session
+
+
+_http_session = _create_http_session()
+_rate_limiter = _TokenBucket(NOMINATIM_REQUESTS_PER_SECOND)
+
+
+def _retry_after_seconds(response: requests.Response) -> Optional[float]:
+    """Return the numeric Retry-After delay of a response, if it has one"""
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _get_with_retries(url: str, params: Dict[str, object]) -> requests.Response:
+    """
+    GET a Nominatim URL, retrying transient failures
+
+    Every attempt waits for a rate limiter token, so retries never push the
+    request rate past Nominatim's usage policy. The last response is returned
+    as-is for the caller to check.
+    """
+    for attempt in range(1, REQUEST_ATTEMPTS + 1):
+        _rate_limiter.acquire()
+        try:
+            response = _http_session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt == REQUEST_ATTEMPTS:
+                raise
+            delay = None
+        else:
+            if (
+                response.status_code not in RETRY_STATUSES
+                or attempt == REQUEST_ATTEMPTS
+            ):
+                return response
+            delay = _retry_after_seconds(response)
+
+        if delay is None:
+            delay = RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)
+        time.sleep(delay)
+
+
+def _is_geocodable(address: str) -> bool:
+    """Return False for address strings that can't produce a useful API result"""
+    if not address:
+        return False
+    address = address.strip()
+    if len(address) < MIN_GEOCODABLE_LENGTH:
+        return False
+    return not _DIGITS_ONLY_RE.match(address)
+
 
 class GeocodingService:
     """Service for address geocoding operations with caching support"""
@@ -42,28 +158,23 @@ class GeocodingService:
             return False
 
         address_string = address.get_geocoding_string()
+        if not _is_geocodable(address_string):
+            logger.warning(
+                f"Skipping geocoding for invalid address: '{address_string}'"
+            )
+            address.latitude = None
+            address.longitude = None
+            return False
 
-        # Check cache first if database session is available
-        if self.db:
-            cached_coords = self._get_from_cache(address_string)
-            if cached_coords:
-                logger.info(f"Retrieved coordinates for '{address_string}' from cache")
-                latitude, longitude = cached_coords
-                address.coordinates = f"POINT({longitude} {latitude})"
-                return True
-
-        # If not in cache or no db session, get from API
-        coordinates = self.get_coordinates(address_string)
+        coordinates = self._lookup_coordinates(
+            address_string, address.get_geocoding_components()
+        )
 
         if coordinates:
             # Update the address object with coordinates
-            longitude, latitude = coordinates[1], coordinates[0]  # Note the order
-            address.coordinates = f"POINT({longitude} {latitude})"
-
-            # Save to cache if database session is available
-            if self.db:
-                self._save_to_cache(address_string, (latitude, longitude))
-
+            latitude, longitude = coordinates
+            address.latitude = latitude
+            address.longitude = longitude
             return True
         else:
             # Even though geocoding failed, we still have a valid address object
@@ -71,34 +182,43 @@ class GeocodingService:
             logger.warning(
                 f"Geocoding failed for address: {address_string}, but continuing with null coordinates"
             )
-            address.coordinates = None
+            address.latitude = None
+            address.longitude = None
             return False
 
-    def get_coordinates(self, address: str) -> Optional[Tuple[float, float]]:
+    def get_coordinates(
+        self, address: Union[str, Dict[str, str]]
+    ) -> Optional[Tuple[float, float]]:
         """
-        Get coordinates for an address string
+        Get coordinates for an address
 
         Args:
-            address: String address to geocode
+            address: Free-form address string, or a dict of structured-search
+                components (street, city, state, postalcode, country). The
+                structured form lets Nominatim search narrower indexes.
 
         Returns:
             Optional tuple of (latitude, longitude)
         """
-        if not address or address.strip() == "":
-            logger.warning("Empty address provided for geocoding")
-            return None
+        if isinstance(address, dict):
+            if not address:
+                logger.warning("Empty address components provided for geocoding")
+                return None
+            params = {**address, "format": "json", "limit": 1}
+        else:
+            if not address or address.strip() == "":
+                logger.warning("Empty address provided for geocoding")
+                return None
+            params = {"q": address, "format": "json", "limit": 1}
 
         logger.info(f"Attempting to geocode address: {address}")
 
         try:
-            # Using Nominatim (OpenStreetMap) as a free geocoding service
-            # In production, consider using a paid service with better rate limits
-            url = "https://nominatim.openstreetmap.org/search"
-            params = {"q": address, "format": "json", "limit": 1}
+            # Using Nominatim (OpenStreetMap) as a free geocoding service; point
+            # NOMINATIM_API_URL at a self-hosted instance for better rate limits
+            url = settings.NOMINATIM_API_URL
 
-            headers = {"User-Agent": "RideShareApp/1.0"}  # Required by Nominatim
-
-            response = requests.get(url, params=params, headers=headers, timeout=10.0)
+            response = _get_with_retries(url, params)
             response.raise_for_status()
 
             data = response.json()
@@ -146,23 +266,55 @@ class GeocodingService:
         self.db = db
 
         success_count = 0
-        processed_count = 0
+        skipped_count = 0
+        pending_updates = []
+
+        # Read ids and geocoding strings up front: each commit expires the
+        # session, and touching an expired Address would reload it row by row
+        targets = [
+            (
+                address,
+                address.id,
+                address.get_geocoding_string(),
+                address.get_geocoding_components(),
+            )
+            for address in addresses
+        ]
 
         try:
-            for address in addresses:
-                processed_count += 1
-                if self.geocode_address(address):
+            for address, address_id, address_string, components in targets:
+                if not _is_geocodable(address_string):
+                    skipped_count += 1
+                    continue
+
+                coordinates = self._lookup_coordinates(address_string, components)
+                if coordinates:
                     success_count += 1
+                    latitude, longitude = coordinates
+                    pending_updates.append(
+                        (
+                            address,
+                            {
+                                "id": address_id,
+                                "latitude": latitude,
+                                "longitude": longitude,
+                            },
+                        )
+                    )
 
-                # Commit in smaller batches to avoid long transactions
-                if processed_count % 10 == 0:
-                    db.commit()
+                # Write in smaller batches to avoid long transactions
+                if len(pending_updates) >= BATCH_COMMIT_SIZE:
+                    self._flush_coordinate_updates(pending_updates, db)
 
-            # Final commit for any remaining addresses
-            db.commit()
+            # Final write for any remaining addresses
+            self._flush_coordinate_updates(pending_updates, db)
             logger.info(
                 f"Successfully geocoded {success_count} out of {len(addresses)} addresses"
             )
+            if skipped_count:
+                logger.info(
+                    f"Skipped {skipped_count} addresses that were not geocodable"
+                )
         except Exception as e:
             db.rollback()
             logger.error(f"Error during batch geocoding: {str(e)}")
@@ -172,6 +324,47 @@ class GeocodingService:
 
         return success_count
 
+    def _lookup_coordinates(
+        self, address_string: str, components: Optional[Dict[str, str]] = None
+    ) -> Optional[Tuple[float, float]]:
+        """
+        Resolve (latitude, longitude) for an address via the cache, then the API
+
+        The cache is keyed by the address string; when structured components
+        are given they are used for the API request instead of the string.
+        """
+        if self.db:
+            cached_coords = self._get_from_cache(address_string)
+            if cached_coords:
+                logger.info(f"Retrieved coordinates for '{address_string}' from cache")
+                return cached_coords
+
+        coordinates = self.get_coordinates(components or address_string)
+        if coordinates and self.db:
+            self._save_to_cache(address_string, coordinates)
+        return coordinates
+
+    def _flush_coordinate_updates(
+        self, pending_updates: List[Tuple[Address, dict]], db: Session
+    ) -> None:
+        """
+        Write pending coordinate updates as one multi-row UPDATE and commit
+
+        The Address objects get the committed values set directly so they
+        don't issue their own per-row UPDATEs on the next flush.
+        """
+        if not pending_updates:
+            return
+
+        db.bulk_update_mappings(Address, [values for _, values in pending_updates])
+        db.commit()
+
+        for address, values in pending_updates:
+            set_committed_value(address, "latitude", values["latitude"])
+            set_committed_value(address, "longitude", values["longitude"])
+
+        pending_updates.clear()
+
     def reverse_geocode(self, latitude: float, longitude: float) -> Optional[dict]:
         """
         Convert coordinates to address
@@ -201,9 +394,7 @@ class GeocodingService:
             url = "https://nominatim.openstreetmap.org/reverse"
             params = {"lat": latitude, "lon": longitude, "format": "json"}
 
-            headers = {"User-Agent": "RideShareApp/1.0"}  # Required by Nominatim
-
-            response = requests.get(url, params=params, headers=headers, timeout=10.0)
+            response = _get_with_retries(url, params)
             response.raise_for_status()
 
             data = response.json()
@@ -1,20 +1,215 @@
+import heapq
 import logging
-from datetime import timedelta
-from math import asin, cos, radians, sin, sqrt
+import math
+from dataclasses import dataclass
+from datetime import date, timedelta
+from operator import itemgetter
+from typing import Dict, Optional, Tuple
 
+import numpy as np
 from geoalchemy2.functions import ST_Distance, ST_DWithin
+from sqlalchemy import case, event, extract, func, literal, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 
+from app.core.cache import TTLCache
 from app.models.hub import Hub
 from app.models.ride import Ride, RideBooking
 from app.models.ride_match_history import RideMatchHistory
 from app.models.user import User
 from app.models.user_matching_preference import UserMatchingPreference
 from app.models.user_travel_pattern import UserTravelPattern
+from app.models.vehicle import VehicleType
 from app.schemas.matching import MatchRequest
 
+try:
+    from numba import njit, prange
+
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
 logger = logging.getLogger(__name__)
 
+# Mean radius of the earth in kilometers
+EARTH_RADIUS_KM = 6371
+
+# Search radius around the user's home location for starting hubs (meters)
+NEARBY_HUB_RADIUS_METERS = 5000
+
+# Nearest hubs considered per requested result
+NEARBY_HUB_FANOUT = 4
+
+# Candidate rides fully scored per requested result, after SQL pre-ranking
+SQL_CANDIDATE_FANOUT = 3
+
+# Half-width of the lat/lng box (about 2 km) checked before an exact haversine
+PATTERN_BBOX_DEGREES = 0.02
+
+# A travel pattern used within this many days counts as recent
+RECENT_PATTERN_DAYS = 14
+
+# Seconds a user's matching profile and preferences are reused across requests
+USER_CACHE_TTL_SECONDS = 30
+
+# Upper bound on cached entries per cache before it is reset
+USER_CACHE_MAX_SIZE = 10000
+
+# Weight of each scoring factor in the final 0-100 ride score
+SCORE_WEIGHTS = {
+    "time": 0.25,
+    "proximity": 0.25,
+    "occupancy": 0.05,
+    "preferences": 0.15,
+    "history": 0.15,
+    "pattern": 0.15,
+}
+
+# Column order of the per-ride factor matrix, and the matching weight vector
+SCORE_FACTORS = ("time", "proximity", "occupancy", "preferences", "history", "pattern")
+SCORE_WEIGHT_VECTOR = np.array(
+    [SCORE_WEIGHTS[factor] for factor in SCORE_FACTORS], dtype=np.float32
+)
+
+
+@dataclass
+class HubRow:
+    """Lightweight nearby-hub result: only the fields scoring needs"""
+
+    # Declared by hand rather than dataclass(slots=True), which needs Python 3.10
+    __slots__ = ("id", "name", "distance")
+
+    id: int
+    name: str
+    distance: float
+
+
+@dataclass
+class MatchUser:
+    """Snapshot of the user fields matching reads, cached between requests"""
+
+    __slots__ = (
+        "id",
+        "home_location",
+        "preferred_starting_hub_id",
+        "preferred_vehicle_type_id",
+        "enterprise_id",
+    )
+
+    id: int
+    home_location: Optional[str]
+    preferred_starting_hub_id: Optional[int]
+    preferred_vehicle_type_id: Optional[int]
+    enterprise_id: Optional[int]
+
+
+@dataclass
+class MatchPrefs:
+    """Snapshot of the matching preferences scoring reads, cached between requests"""
+
+    __slots__ = (
+        "max_walking_distance_meters",
+        "prefer_same_enterprise",
+        "minimum_driver_rating",
+        "preferred_language",
+    )
+
+    max_walking_distance_meters: Optional[int]
+    prefer_same_enterprise: Optional[bool]
+    minimum_driver_rating: Optional[float]
+    preferred_language: Optional[str]
+
+
+# Keyed by user id and shared across service instances
+_user_cache = TTLCache(USER_CACHE_TTL_SECONDS, USER_CACHE_MAX_SIZE)
+_prefs_cache = TTLCache(USER_CACHE_TTL_SECONDS, USER_CACHE_MAX_SIZE)
+
+# Distinguishes "not cached" from a cached "user has no preferences"
+_MISSING = object()
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    _user_cache.invalidate(target.id)
+
+
+@event.listens_for(UserMatchingPreference, "after_insert")
+@event.listens_for(UserMatchingPreference, "after_update")
+@event.listens_for(UserMatchingPreference, "after_delete")
+def _invalidate_cached_prefs(mapper, connection, target):
+    _prefs_cache.invalidate(target.user_id)
+
+
+def _score_kernel(
+    time_diff_min,
+    dist_m,
+    capacity,
+    available,
+    time_flexibility,
+    max_walking_distance,
+    all_scores,
+):
+    """
+    Fill the time, proximity and occupancy columns of the factor matrix
+
+    Written as a plain loop so Numba can compile it to vectorized machine
+    code; without Numba it runs as regular Python over the same arrays.
+    """
+    n = time_diff_min.shape[0]
+    for i in range(n):
+        all_scores[i, 0] = max(
+            0.0, 100.0 - (time_diff_min[i] / time_flexibility) * 50.0
+        )
+        all_scores[i, 1] = max(0.0, 100.0 - (dist_m[i] / max_walking_distance) * 100.0)
+        occupancy_score = 0.0
+        if capacity[i] > 0:
+            occupancy = (capacity[i] - available[i]) / capacity[i]
+            # Prefer rides that already have some passengers but still have space
+            occupancy_score = 100.0 - abs(0.5 - occupancy) * 100.0
+        all_scores[i, 2] = occupancy_score
+
+
+if HAS_NUMBA:
+    # JIT cost is paid once per process (and cached on disk across restarts)
+    _score_kernel = njit(cache=True, fastmath=True)(_score_kernel)
+
+
+if HAS_NUMBA:
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _haversine_batch(lat1, lon1, lats2, lons2):
+        """Great circle distances (km) from one point to arrays of points"""
+        n = lats2.shape[0]
+        out = np.empty(n)
+        # Invariants of the single origin point, hoisted out of the loop
+        lat1_r = math.radians(lat1)
+        cos_lat1 = math.cos(lat1_r)
+        for i in prange(n):
+            lat2_r = math.radians(lats2[i])
+            dlat = lat2_r - lat1_r
+            dlon = math.radians(lons2[i] - lon1)
+            a = (
+                math.sin(dlat / 2) ** 2
+                + cos_lat1 * math.cos(lat2_r) * math.sin(dlon / 2) ** 2
+            )
+            out[i] = EARTH_RADIUS_KM * 2 * math.asin(math.sqrt(a))
+        return out
+
+else:
+
+    def _haversine_batch(lat1, lon1, lats2, lons2):
+        """Great circle distances (km) from one point to arrays of points"""
+        # Scalar invariants of the origin point, broadcast over the arrays
+        lat1_r = math.radians(lat1)
+        cos_lat1 = math.cos(lat1_r)
+        lats2_r = np.radians(lats2)
+        dlat = lats2_r - lat1_r
+        dlon = np.radians(lons2 - lon1)
+        a = np.sin(dlat / 2) ** 2 + cos_lat1 * np.cos(lats2_r) * np.sin(dlon / 2) ** 2
+        return EARTH_RADIUS_KM * 2 * np.arcsin(np.sqrt(a))
+
 
 class MatchingService:
     """Service for matching users to suitable rides"""
@@ -36,7 +231,7 @@ class MatchingService:
             List of matching rides ranked by suitability
         """
         logger.info(f"Finding matches for user {user_id}")
-        user = self.db.query(User).filter(User.id == user_id).first()
+        user = self._get_match_user(user_id)
         if not user or not user.home_location:
             logger.warning(f"User {user_id} not found or missing home location")
             return []
@@ -49,33 +244,107 @@ class MatchingService:
             minutes=match_request.time_flexibility
         )
 
-        # Find nearby hubs
-        nearby_hubs = (
-            self.db.query(
-                Hub, ST_Distance(Hub.coordinates, user.home_location).label("distance")
+        # Find the nearest hubs; ordering by the <-> operator lets PostGIS walk
+        # the GiST index and stop after the limit instead of ranking every hub.
+        # The same <-> expression is selected as the distance so it is only
+        # evaluated once per hub rather than again through ST_Distance
+        hub_distance = Hub.coordinates.op("<->")(user.home_location)
+        hub_rows = (
+            self.db.query(Hub.id, Hub.name, hub_distance.label("distance"))
+            .filter(
+                ST_DWithin(
+                    Hub.coordinates, user.home_location, NEARBY_HUB_RADIUS_METERS
+                )
             )
-            .filter(ST_DWithin(Hub.coordinates, user.home_location, 5000))  # 5km radius
-            .order_by("distance")
+            .order_by(hub_distance)
+            .limit(match_request.max_results * NEARBY_HUB_FANOUT)
             .all()
         )
+        # Index by hub id so per-ride hub lookups are O(1)
+        nearby_hubs = {
+            row.id: HubRow(row.id, row.name, row.distance) for row in hub_rows
+        }
 
-        hub_ids = [hub.Hub.id for hub in nearby_hubs]
+        hub_ids = list(nearby_hubs)
         if not hub_ids:
             logger.info(f"No hubs within 5km for user {user_id}")
             return []
 
-        # Find rides within time window with available seats
-        rides = (
-            self.db.query(Ride)
+        # Get user matching preferences if they exist
+        user_prefs = self._get_match_prefs(user.id)
+        max_walking_distance = (
+            user_prefs.max_walking_distance_meters if user_prefs else 1000
+        )
+
+        # Travel patterns for the requested weekday, shared by every ride scored
+        travel_patterns = (
+            self.db.query(UserTravelPattern)
             .filter(
+                UserTravelPattern.user_id == user.id,
+                UserTravelPattern.day_of_week == match_request.departure_time.weekday(),
+            )
+            .all()
+        )
+
+        # Pre-rank rides in SQL on the time and hub-proximity factors (half of
+        # the total weight) so only the best candidates are loaded and go
+        # through the full history/pattern scoring
+        time_diff_minutes = (
+            func.abs(
+                extract(
+                    "epoch", Ride.departure_time - literal(match_request.departure_time)
+                )
+            )
+            / 60
+        )
+        time_score = func.greatest(
+            0, 100 - time_diff_minutes / max(match_request.time_flexibility, 1) * 50
+        )
+        proximity_score = case(
+            (Ride.starting_hub_id == user.preferred_starting_hub_id, 100),
+            else_=func.greatest(
+                0,
+                100
+                - ST_Distance(Hub.coordinates, user.home_location)
+                / max_walking_distance
+                * 100,
+            ),
+        )
+        prefilter_score = (
+            time_score * SCORE_WEIGHTS["time"]
+            + proximity_score * SCORE_WEIGHTS["proximity"]
+        )
+
+        # Find rides within time window with available seats, selecting only
+        # the columns scoring and the response need instead of ORM entities
+        rides = self.db.execute(
+            select(
+                Ride.id,
+                Ride.departure_time,
+                Ride.arrival_time,
+                Ride.starting_hub_id,
+                Ride.destination_hub_id,
+                Ride.destination_lat.label("destination_latitude"),
+                Ride.destination_lng.label("destination_longitude"),
+                VehicleType.name.label("vehicle_type"),
+                Ride.vehicle_type_id,
+                Ride.available_seats,
+                VehicleType.capacity.label("capacity"),
+                Ride.driver_id,
+                Ride.price_per_seat,
+            )
+            .join(Hub, Hub.id == Ride.starting_hub_id)
+            .join(VehicleType, VehicleType.id == Ride.vehicle_type_id)
+            .where(
                 Ride.destination_id == match_request.destination_id,
                 Ride.starting_hub_id.in_(hub_ids),
                 Ride.departure_time.between(time_min, time_max),
                 Ride.status == "scheduled",
                 Ride.available_seats > 0,
             )
-            .all()
-        )
+            .order_by(prefilter_score.desc())
+            .limit(match_request.max_results * SQL_CANDIDATE_FANOUT)
+        ).all()
 
         if not rides:
             logger.info(
@@ -83,43 +352,87 @@ class MatchingService:
             )
             return []
 
+        # Load every driver of the candidate rides in one query
+        driver_ids = {ride.driver_id for ride in rides if ride.driver_id}
+        drivers = (
+            {
+                driver.id: driver
+                for driver in self.db.query(User).filter(User.id.in_(driver_ids))
+            }
+            if driver_ids
+            else {}
+        )
+
+        # Aggregate the user's history with these drivers once per request:
+        # rides taken together and positively rated accepted matches
+        ride_counts = {}
+        positive_feedback_counts = {}
+        if driver_ids:
+            ride_counts = dict(
+                self.db.query(Ride.driver_id, func.count(Ride.id))
+                .join(RideBooking, RideBooking.ride_id == Ride.id)
+                .filter(
+                    RideBooking.passenger_id == user.id,
+                    Ride.driver_id.in_(driver_ids),
+                )
+                .group_by(Ride.driver_id)
+                .all()
+            )
+            positive_feedback_counts = dict(
+                self.db.query(
+                    RideMatchHistory.matched_user_id, func.count(RideMatchHistory.id)
+                )
+                .filter(
+                    RideMatchHistory.user_id == user.id,
+                    RideMatchHistory.matched_user_id.in_(driver_ids),
+                    RideMatchHistory.was_accepted == True,
+                    RideMatchHistory.feedback_rating >= 4,
+                )
+                .group_by(RideMatchHistory.matched_user_id)
+                .all()
+            )
+
         # Score and sort rides by suitability
-        scored_rides = []
-        for ride in rides:
-            score = self._calculate_ride_score(ride, user, match_request, nearby_hubs)
+        ride_scores, ride_reasons = self._calculate_ride_scores(
+            rides,
+            user,
+            match_request,
+            nearby_hubs,
+            drivers,
+            ride_counts,
+            positive_feedback_counts,
+            user_prefs,
+            travel_patterns,
+        )
 
+        scored_rides = []
+        for ride, score, reasons in zip(rides, ride_scores, ride_reasons):
             # Only include rides above a minimum score threshold
-            if score > 20:  # Score is on a 0-100 scale
-                scored_rides.append((ride, score))
+            if score is not None and score > 20:  # Score is on a 0-100 scale
+                scored_rides.append((ride, score, reasons))
 
-        # Sort by score and convert to response model
-        scored_rides.sort(key=lambda x: x[1], reverse=True)
-
-        # Limit to requested max_results
-        max_results = min(match_request.max_results, len(scored_rides))
-        top_matches = scored_rides[:max_results]
+        # Keep the requested number of best-scored rides, best first
+        top_matches = heapq.nlargest(
+            match_request.max_results, scored_rides, key=itemgetter(1)
+        )
 
         # Convert to response models
         matches = []
-        for ride, score in top_matches:
-            # Get match reasons
-            match_reasons = self._get_match_reasons(ride, user, match_request, score)
+        for ride, score, reasons in top_matches:
+            # Reuse the reasons gathered while scoring
+            match_reasons = self._get_match_reasons(reasons, score)
 
             # Get driver information if available
             driver_name = None
             driver_rating = None
             if hasattr(ride, "driver_id") and ride.driver_id:
-                driver = self.db.query(User).filter(User.id == ride.driver_id).first()
+                driver = drivers.get(ride.driver_id)
                 if driver:
                     driver_name = f"{driver.first_name} {driver.last_name}"
                     # In a real system, you would get the driver's rating
                     driver_rating = 4.5  # Placeholder
 
-            hub_name = next(
-                hub.Hub.name
-                for hub in nearby_hubs
-                if hub.Hub.id == ride.starting_hub_id
-            )
+            hub_name = nearby_hubs[ride.starting_hub_id].name
             matches.append(
                 {
                     "ride_id": ride.id,
@@ -143,116 +456,213 @@ class MatchingService:
         logger.info(f"Found {len(matches)} matches for user {user_id}")
         return matches
 
-    def _calculate_ride_score(
-        self, ride: Ride, user: User, match_request: MatchRequest, nearby_hubs: list
-    ) -> float:
-        """
-        Calculate a ride's suitability score based on multiple factors
-
-        Higher score = better match (0-100 scale)
-        """
-        scores = {}
-        match_reasons = []
+    def _get_match_user(self, user_id: int) -> Optional[MatchUser]:
+        """Load the user's matching profile, reusing it for a short TTL"""
+        user = _user_cache.get(user_id)
+        if user is not None:
+            return user
 
-        # Get user matching preferences if they exist
-        user_prefs = (
-            self.db.query(UserMatchingPreference)
-            .filter(UserMatchingPreference.user_id == user.id)
+        row = (
+            self.db.query(
+                User.id,
+                User.home_location,
+                User.preferred_starting_hub_id,
+                User.preferred_vehicle_type_id,
+                User.enterprise_id,
+            )
+            .filter(User.id == user_id)
             .first()
         )
+        if not row:
+            return None
 
-        # Factor 1: Time match (how close to requested departure time)
-        time_diff = abs(
-            (ride.departure_time - match_request.departure_time).total_seconds() / 60
-        )
-        time_flexibility = max(
-            match_request.time_flexibility, 1
-        )  # Avoid division by zero
-        time_score = max(0, 100 - (time_diff / time_flexibility) * 50)
-        scores["time"] = time_score
-
-        if time_diff <= 5:
-            match_reasons.append("Exact time match")
-        elif time_diff <= 15:
-            match_reasons.append(
-                f"Close departure time ({int(time_diff)} min difference)"
+        user = MatchUser(*row)
+        _user_cache.set(user_id, user)
+        return user
+
+    def _get_match_prefs(self, user_id: int) -> Optional[MatchPrefs]:
+        """Load the user's matching preferences, reusing them for a short TTL"""
+        prefs = _prefs_cache.get(user_id, _MISSING)
+        if prefs is not _MISSING:
+            return prefs
+
+        row = (
+            self.db.query(
+                UserMatchingPreference.max_walking_distance_meters,
+                UserMatchingPreference.prefer_same_enterprise,
+                UserMatchingPreference.minimum_driver_rating,
+                UserMatchingPreference.preferred_language,
             )
+            .filter(UserMatchingPreference.user_id == user_id)
+            .first()
+        )
+        prefs = MatchPrefs(*row) if row else None
+        _prefs_cache.set(user_id, prefs)
+        return prefs
 
-        # Factor 2: Hub proximity (how close is the starting hub to user)
-        hub_distance = next(
-            (hub.distance for hub in nearby_hubs if hub.Hub.id == ride.starting_hub_id),
-            5000,
+    def _calculate_ride_scores(
+        self,
+        rides: list,
+        user: MatchUser,
+        match_request: MatchRequest,
+        nearby_hubs: Dict[int, HubRow],
+        drivers: Dict[int, User],
+        ride_counts: Dict[int, int],
+        positive_feedback_counts: Dict[int, int],
+        user_prefs: Optional[MatchPrefs] = None,
+        travel_patterns: Optional[list] = None,
+    ) -> Tuple[list[Optional[float]], list[list[str]]]:
+        """
+        Calculate each ride's suitability score based on multiple factors
+
+        Higher score = better match (0-100 scale). Factor inputs are gathered
+        per ride into an (N, 6) factor matrix, which is then weighted with a
+        single matrix-vector product. The preference, history and pattern
+        factors are skipped for rides that cannot reach the top max_results.
+
+        Returns:
+            The scores (None for skipped rides) and the match reasons per ride
+        """
+        n = len(rides)
+        # float32 is plenty for 0-100 scores and halves the memory traffic
+        time_diff_min = np.empty(n, dtype=np.float32)
+        dist_m = np.empty(n, dtype=np.float32)
+        capacity = np.empty(n, dtype=np.float32)
+        available = np.empty(n, dtype=np.float32)
+        all_scores = np.empty((n, len(SCORE_FACTORS)), dtype=np.float32)
+        ride_reasons = []
+
+        # Patterns last traveled after this date count as recent
+        recent_cutoff = match_request.departure_time.date() - timedelta(
+            days=RECENT_PATTERN_DAYS
         )
 
-        # If user has a preferred hub and it matches, give a bonus
-        if (
-            user.preferred_starting_hub_id
-            and user.preferred_starting_hub_id == ride.starting_hub_id
-        ):
-            proximity_score = 100
-            match_reasons.append("Preferred starting hub")
-        else:
-            # Score decreases as distance increases
-            max_walking_distance = (
-                user_prefs.max_walking_distance_meters if user_prefs else 1000
+        for i, ride in enumerate(rides):
+            match_reasons = []
+
+            # Factor 1: Time match (how close to requested departure time)
+            time_diff = abs(
+                (ride.departure_time - match_request.departure_time).total_seconds()
+                / 60
             )
-            proximity_score = max(0, 100 - (hub_distance / max_walking_distance) * 100)
+            time_diff_min[i] = time_diff
 
-            if hub_distance <= 200:
-                match_reasons.append("Very close to starting hub")
-            elif hub_distance <= 500:
-                match_reasons.append("Walking distance to starting hub")
+            if time_diff <= 5:
+                match_reasons.append("Exact time match")
+            elif time_diff <= 15:
+                match_reasons.append(
+                    f"Close departure time ({int(time_diff)} min difference)"
+                )
 
-        scores["proximity"] = proximity_score
+            # Factor 2: Hub proximity (how close is the starting hub to user)
+            hub = nearby_hubs.get(ride.starting_hub_id)
+            hub_distance = hub.distance if hub else NEARBY_HUB_RADIUS_METERS
 
-        # Factor 3: Ride occupancy (not too empty, not too full)
-        occupancy = (ride.capacity - ride.available_seats) / ride.capacity
-        # Prefer rides that already have some passengers but still have space
-        occupancy_score = 100 - abs(0.5 - occupancy) * 100
-        scores["occupancy"] = occupancy_score
+            # If user has a preferred hub and it matches, give full proximity
+            if (
+                user.preferred_starting_hub_id
+                and user.preferred_starting_hub_id == ride.starting_hub_id
+            ):
+                dist_m[i] = 0
+                match_reasons.append("Preferred starting hub")
+            else:
+                dist_m[i] = hub_distance
 
-        # Factor 4: User preferences (if applicable)
-        pref_score, pref_reasons = self._calculate_preference_score(
-            ride, user, user_prefs
-        )
-        scores["preferences"] = pref_score
-        match_reasons.extend(pref_reasons)
+                if hub_distance <= 200:
+                    match_reasons.append("Very close to starting hub")
+                elif hub_distance <= 500:
+                    match_reasons.append("Walking distance to starting hub")
 
-        # Factor 5: Past ride history with these companions
-        history_score, history_reasons = self._calculate_history_score(ride, user)
-        scores["history"] = history_score
-        match_reasons.extend(history_reasons)
+            # Factor 3: Ride occupancy (not too empty, not too full)
+            capacity[i] = ride.capacity
+            available[i] = ride.available_seats
 
-        # Factor 6: Travel pattern match
-        pattern_score, pattern_reasons = self._calculate_pattern_score(
-            ride, user, match_request
+            ride_reasons.append(match_reasons)
+
+        # Score decreases as distance increases
+        max_walking_distance = (
+            user_prefs.max_walking_distance_meters if user_prefs else 1000
+        )
+        _score_kernel(
+            time_diff_min,
+            dist_m,
+            capacity,
+            available,
+            float(max(match_request.time_flexibility, 1)),  # Avoid division by zero
+            float(max_walking_distance),
+            all_scores,
         )
-        scores["pattern"] = pattern_score
-        match_reasons.extend(pattern_reasons)
-
-        # Apply weightings to each factor
-        weights = {
-            "time": 0.25,
-            "proximity": 0.25,
-            "occupancy": 0.05,
-            "preferences": 0.15,
-            "history": 0.15,
-            "pattern": 0.15,
-        }
 
-        # Calculate weighted average
-        final_score = sum(scores[factor] * weight for factor, weight in weights.items())
+        # Best score each ride could still reach: its cheap factors plus full
+        # marks on the preference, history and pattern factors
+        base_scores = all_scores[:, :3] @ SCORE_WEIGHT_VECTOR[:3]
+        upper_bounds = base_scores + 100 * SCORE_WEIGHT_VECTOR[3:].sum()
 
-        # Record this match in history for future reference
-        if ride.driver_id:
-            self._record_match_history(
-                user.id, ride.driver_id, ride.id, final_score, match_reasons
+        # Run the expensive factors best-bound first, and stop once the current
+        # top max_results can no longer be beaten by any remaining ride
+        top_scores = []  # min-heap of the best max_results scores so far
+        scored = []
+        for i in np.argsort(-upper_bounds, kind="stable").tolist():
+            if (
+                len(top_scores) >= match_request.max_results
+                and top_scores[0] >= upper_bounds[i]
+            ):
+                break
+
+            ride = rides[i]
+            match_reasons = ride_reasons[i]
+
+            # Factor 4: User preferences (if applicable)
+            pref_score, pref_reasons = self._calculate_preference_score(
+                ride, user, drivers, user_prefs
+            )
+            all_scores[i, 3] = pref_score
+            match_reasons.extend(pref_reasons)
+
+            # Factor 5: Past ride history with these companions
+            history_score, history_reasons = self._calculate_history_score(
+                ride, ride_counts, positive_feedback_counts
+            )
+            all_scores[i, 4] = history_score
+            match_reasons.extend(history_reasons)
+
+            # Factor 6: Travel pattern match
+            pattern_score, pattern_reasons = self._calculate_pattern_score(
+                ride, travel_patterns, recent_cutoff
             )
+            all_scores[i, 5] = pattern_score
+            match_reasons.extend(pattern_reasons)
 
-        return final_score
+            score = float(all_scores[i] @ SCORE_WEIGHT_VECTOR)
+            if len(top_scores) < match_request.max_results:
+                heapq.heappush(top_scores, score)
+            else:
+                heapq.heappushpop(top_scores, score)
+            scored.append(i)
+
+        final_scores = [None] * n
+        scored_values = (all_scores[scored] @ SCORE_WEIGHT_VECTOR).tolist()
+        for i, final_score in zip(scored, scored_values):
+            final_scores[i] = final_score
+
+        # Record these matches in history for future reference
+        self._record_match_history(
+            user.id,
+            [
+                (rides[i].driver_id, rides[i].id, final_scores[i], ride_reasons[i])
+                for i in scored
+                if rides[i].driver_id
+            ],
+        )
+
+        return final_scores, ride_reasons
 
     def _calculate_preference_score(
-        self, ride: Ride, user: User, user_prefs: UserMatchingPreference = None
+        self,
+        ride: Ride,
+        user: MatchUser,
+        drivers: Dict[int, User],
+        user_prefs: Optional[MatchPrefs] = None,
     ) -> tuple:
         """Calculate how well the ride matches user preferences"""
         score = 50  # Default neutral score
@@ -270,7 +680,7 @@ class MatchingService:
         if user_prefs and user_prefs.prefer_same_enterprise and user.enterprise_id:
             # Get the driver's enterprise ID if available
             if ride.driver_id:
-                driver = self.db.query(User).filter(User.id == ride.driver_id).first()
+                driver = drivers.get(ride.driver_id)
                 if driver and driver.enterprise_id == user.enterprise_id:
                     score += 20
                     reasons.append("Same enterprise")
@@ -289,39 +699,27 @@ class MatchingService:
 
         return max(0, min(100, score)), reasons  # Clamp to 0-100 range
 
-    def _calculate_history_score(self, ride: Ride, user: User) -> tuple:
-        """Calculate score based on user's ride history"""
+    def _calculate_history_score(
+        self,
+        ride: Ride,
+        ride_counts: Dict[int, int],
+        positive_feedback_counts: Dict[int, int],
+    ) -> tuple:
+        """
+        Calculate score based on user's ride history
+
+        Args:
+            ride: Candidate ride
+            ride_counts: Rides the user has booked, per driver id
+            positive_feedback_counts: Accepted matches rated 4+, per driver id
+        """
         score = 0
         reasons = []
 
         # Check ride match history
         if ride.driver_id:
-            # Count successful matches with this driver
-            match_history = (
-                self.db.query(RideMatchHistory)
-                .filter(
-                    RideMatchHistory.user_id == user.id,
-                    RideMatchHistory.matched_user_id == ride.driver_id,
-                    RideMatchHistory.was_accepted == True,
-                )
-                .all()
-            )
-
-            # Count rides with this driver
-            rides_with_driver = (
-                self.db.query(Ride)
-                .filter(
-                    Ride.driver_id == ride.driver_id,
-                    Ride.id.in_(
-                        self.db.query(RideBooking.ride_id).filter(
-                            RideBooking.user_id == user.id
-                        )
-                    ),
-                )
-                .count()
-            )
-
-            # Calculate score based on history
+            # Calculate score based on rides with this driver
+            rides_with_driver = ride_counts.get(ride.driver_id, 0)
             if rides_with_driver > 0:
                 score += min(60, rides_with_driver * 15)
                 if rides_with_driver == 1:
@@ -330,38 +728,50 @@ class MatchingService:
                     reasons.append(f"Rode together {rides_with_driver} times before")
 
             # Add bonus for positive feedback
-            positive_feedback = [
-                m for m in match_history if m.feedback_rating and m.feedback_rating >= 4
-            ]
+            positive_feedback = positive_feedback_counts.get(ride.driver_id, 0)
             if positive_feedback:
-                score += min(40, len(positive_feedback) * 10)
+                score += min(40, positive_feedback * 10)
                 reasons.append("Positive past experience")
 
         return min(100, score), reasons
 
     def _calculate_pattern_score(
-        self, ride: Ride, user: User, match_request: MatchRequest
+        self,
+        ride: Ride,
+        travel_patterns: Optional[list],
+        recent_cutoff: date,
     ) -> tuple:
-        """Calculate score based on user's travel patterns"""
+        """Calculate score based on user's travel patterns for the request day"""
         score = 0
         reasons = []
 
-        # Get user's travel patterns
-        travel_patterns = (
-            self.db.query(UserTravelPattern)
-            .filter(
-                UserTravelPattern.user_id == user.id,
-                UserTravelPattern.day_of_week == match_request.departure_time.weekday(),
-            )
-            .all()
-        )
-
         if not travel_patterns:
             return 0, []  # No patterns to match against
 
+        # Distance from the ride destination to every pattern destination at once
+        dest_distances = None
+        if ride.destination_latitude and ride.destination_longitude:
+            pattern_lats = np.array([p.destination_latitude for p in travel_patterns])
+            pattern_lons = np.array([p.destination_longitude for p in travel_patterns])
+
+            # Cheap bounding-box check first; only nearby patterns get a haversine
+            near = (
+                np.abs(pattern_lats - ride.destination_latitude) < PATTERN_BBOX_DEGREES
+            ) & (
+                np.abs(pattern_lons - ride.destination_longitude) < PATTERN_BBOX_DEGREES
+            )
+            dest_distances = np.full(len(travel_patterns), np.inf)
+            if near.any():
+                dest_distances[near] = _haversine_batch(
+                    ride.destination_latitude,
+                    ride.destination_longitude,
+                    pattern_lats[near],
+                    pattern_lons[near],
+                )
+
         # Find patterns that match this ride's route
         matching_patterns = []
-        for pattern in travel_patterns:
+        for i, pattern in enumerate(travel_patterns):
             # Check if origin matches
             origin_matches = False
             if (
@@ -378,16 +788,9 @@ class MatchingService:
                 and pattern.destination_id == ride.destination_hub_id
             ):
                 dest_matches = True
-            elif ride.destination_latitude and ride.destination_longitude:
-                # Calculate distance between ride destination and pattern destination
-                dest_distance = self._haversine(
-                    ride.destination_latitude,
-                    ride.destination_longitude,
-                    pattern.destination_latitude,
-                    pattern.destination_longitude,
-                )
-                if dest_distance < 1.0:  # Within 1km
-                    dest_matches = True
+            elif dest_distances is not None and dest_distances[i] < 1.0:
+                # Pattern destination within 1km of the ride destination
+                dest_matches = True
 
             if origin_matches and dest_matches:
                 matching_patterns.append(pattern)
@@ -408,8 +811,7 @@ class MatchingService:
             recent_patterns = [
                 p
                 for p in matching_patterns
-                if p.last_traveled
-                and (match_request.departure_time.date() - p.last_traveled).days < 14
+                if p.last_traveled and p.last_traveled > recent_cutoff
             ]
             if recent_patterns:
                 score += 20
@@ -417,126 +819,56 @@ class MatchingService:
 
         return min(100, score), reasons
 
-    def _record_match_history(
-        self,
-        user_id: int,
-        matched_user_id: int,
-        ride_id: int,
-        match_score: float,
-        match_reasons: list,
-    ) -> None:
-        """Record a match in the history for future reference"""
-        # Check if this match already exists
-        existing_match = (
-            self.db.query(RideMatchHistory)
-            .filter(
-                RideMatchHistory.user_id == user_id,
-                RideMatchHistory.matched_user_id == matched_user_id,
-                RideMatchHistory.ride_id == ride_id,
-            )
-            .first()
-        )
-
-        if existing_match:
-            # Update existing match
-            existing_match.match_score = match_score
-            if match_reasons:
-                existing_match.match_reason = (
-                    match_reasons[0] if len(match_reasons) > 0 else None
-                )
-            self.db.commit()
-        else:
-            # Create new match history entry
-            new_match = RideMatchHistory(
-                user_id=user_id,
-                matched_user_id=matched_user_id,
-                ride_id=ride_id,
-                match_score=match_score,
-                match_reason=match_reasons[0] if len(match_reasons) > 0 else None,
-            )
-            self.db.add(new_match)
-            self.db.commit()
-
-    def _get_match_reasons(
-        self, ride: Ride, user: User, match_request: MatchRequest, score: float
-    ) -> list:
-        """Generate human-readable reasons for why this ride is a good match"""
-        reasons = []
-
-        # Time match
-        time_diff = abs(
-            (ride.departure_time - match_request.departure_time).total_seconds() / 60
-        )
-        if time_diff <= 5:
-            reasons.append("Exact time match")
-        elif time_diff <= 15:
-            reasons.append(f"Close departure time ({int(time_diff)} min difference)")
-
-        # Hub match
-        if (
-            user.preferred_starting_hub_id
-            and user.preferred_starting_hub_id == ride.starting_hub_id
-        ):
-            reasons.append("Preferred starting hub")
-
-        # Enterprise match
-        if hasattr(ride, "driver_id") and ride.driver_id and user.enterprise_id:
-            driver = self.db.query(User).filter(User.id == ride.driver_id).first()
-            if driver and driver.enterprise_id == user.enterprise_id:
-                reasons.append("Same enterprise")
-
-        # Vehicle type match
-        if (
-            user.preferred_vehicle_type_id
-            and hasattr(ride, "vehicle_type_id")
-            and ride.vehicle_type_id == user.preferred_vehicle_type_id
-        ):
-            reasons.append("Preferred vehicle type")
-
-        # Ride history
-        if hasattr(ride, "driver_id") and ride.driver_id:
-            rides_with_driver = (
-                self.db.query(Ride)
-                .filter(
-                    Ride.driver_id == ride.driver_id,
-                    Ride.id.in_(
-                        self.db.query(RideBooking.ride_id).filter(
-                            RideBooking.user_id == user.id
-                        )
-                    ),
-                )
-                .count()
-            )
+    def _record_match_history(self, user_id: int, matches: list) -> None:
+        """
+        Record scored matches in the history for future reference
 
-            if rides_with_driver == 1:
-                reasons.append("Rode together once before")
-            elif rides_with_driver > 1:
-                reasons.append(f"Rode together {rides_with_driver} times before")
+        All rows are upserted with a single INSERT ... ON CONFLICT statement
+        and one commit, keyed by the (user, matched user, ride) constraint.
 
-        # Travel pattern match
-        travel_patterns = (
-            self.db.query(UserTravelPattern)
-            .filter(
-                UserTravelPattern.user_id == user.id,
-                UserTravelPattern.day_of_week == match_request.departure_time.weekday(),
-            )
-            .all()
+        Args:
+            user_id: ID of the user seeking a ride
+            matches: (matched_user_id, ride_id, match_score, match_reasons) tuples
+        """
+        if not matches:
+            return
+
+        rows = [
+            {
+                "user_id": user_id,
+                "matched_user_id": matched_user_id,
+                "ride_id": ride_id,
+                "match_score": match_score,
+                "match_reason": match_reasons[0] if match_reasons else None,
+            }
+            for matched_user_id, ride_id, match_score, match_reasons in matches
+        ]
+
+        if self.db.get_bind().dialect.name == "postgresql":
+            insert = postgresql_insert
+        else:
+            insert = sqlite_insert
+
+        stmt = insert(RideMatchHistory).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "matched_user_id", "ride_id"],
+            set_={
+                "match_score": stmt.excluded.match_score,
+                # Keep the previous reason when this match produced none
+                "match_reason": func.coalesce(
+                    stmt.excluded.match_reason, RideMatchHistory.match_reason
+                ),
+            },
         )
+        self.db.execute(stmt)
+        self.db.commit()
 
-        for pattern in travel_patterns:
-            if (
-                pattern.origin_type == "hub"
-                and pattern.origin_id == ride.starting_hub_id
-            ):
-                if (
-                    ride.destination_hub_id
-                    and pattern.destination_type == "hub"
-                    and pattern.destination_id == ride.destination_hub_id
-                ):
-                    reasons.append("Matches your regular travel pattern")
-                    break
-
-        # If we don't have enough reasons, add generic ones based on score
+    def _get_match_reasons(self, reasons: list, score: float) -> list:
+        """
+        Complete the reasons collected during scoring with a generic one
+        based on the overall score when fewer than two were found
+        """
+        reasons = list(reasons)
         if len(reasons) < 2:
             if score > 80:
                 reasons.append("Excellent overall match")
@@ -544,16 +876,3 @@ class MatchingService:
                 reasons.append("Good overall match")
 
         return reasons
-
-    def _haversine(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-        """Calculate the great circle distance between two points on earth"""
-        # Convert decimal degrees to radians
-        lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-
-        # Haversine formula
-        dlon = lon2 - lon1
-        dlat = lat2 - lat1
-        a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
-        c = 2 * asin(sqrt(a))
-        r = 6371  # Radius of earth in kilometers
-        return c * r
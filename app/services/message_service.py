@@ -1,8 +1,8 @@
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
-from sqlalchemy import desc
-from sqlalchemy.orm import Session
+from sqlalchemy import desc, func
+from sqlalchemy.orm import Session, joinedload, selectinload
 
 from app.models.message import (
     Conversation,
@@ -61,6 +61,8 @@ class MessageService:
         """Get all conversations for a user"""
         return (
             db.query(Conversation)
+            # Load participants for the whole page in one extra query
+            .options(selectinload(Conversation.participants))
             .join(conversation_participants)
             .filter(conversation_participants.c.user_id == user_id)
             .filter(Conversation.is_active == True)
@@ -157,6 +159,7 @@ class MessageService:
         """Get messages for a conversation"""
         return (
             db.query(Message)
+            .options(joinedload(Message.sender))
             .filter(Message.conversation_id == conversation_id)
             .order_by(desc(Message.sent_at))
             .offset(skip)
@@ -196,21 +199,20 @@ class MessageService:
     @staticmethod
     def get_unread_messages_count(db: Session, user_id: int) -> int:
         """Get count of unread messages for a user"""
-        # Query all conversations where the user is a participant
-        user_conversations = (
-            db.query(Conversation.id)
-            .join(conversation_participants)
+        # Count unread messages in the user's active conversations with one
+        # COUNT over a join instead of an IN (subquery) and row loading
+        unread_count = (
+            db.query(func.count(Message.id))
+            .join(Conversation, Conversation.id == Message.conversation_id)
+            .join(
+                conversation_participants,
+                conversation_participants.c.conversation_id == Conversation.id,
+            )
             .filter(conversation_participants.c.user_id == user_id)
             .filter(Conversation.is_active == True)
-        )
-
-        # Count unread messages in those conversations
-        unread_count = (
-            db.query(Message)
-            .filter(Message.conversation_id.in_(user_conversations.subquery()))
             .filter(Message.sender_id != user_id)
             .filter(Message.read_at == None)
-            .count()
+            .scalar()
         )
 
         return unread_count
@@ -1,18 +1,140 @@
+import asyncio
 import json
 import logging
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 from fastapi import HTTPException, WebSocket
-from sqlalchemy.orm import Session
-
-from app.models.message import Conversation, ConversationMessage as Message
+from fastapi.concurrency import run_in_threadpool
+from fastapi.websockets import WebSocketState
+from sqlalchemy import event, func, literal, select, union_all, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from app.core.cache import TTLCache
+from app.models.message import (
+    Conversation,
+    ConversationMessage as Message,
+    conversation_participants,
+)
 from app.models.ride import Ride, RideBooking
 from app.models.user import User
 from app.schemas.message import ConversationCreate, MessageCreate
 
+try:
+    import msgspec
+
+    HAS_MSGSPEC = True
+except ImportError:
+    HAS_MSGSPEC = False
+
+try:
+    import orjson
+
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 logger = logging.getLogger(__name__)
 
+# WebSocket sends awaited together per batch when broadcasting to a conversation
+BROADCAST_BATCH_SIZE = 50
+
+# Broadcasts allowed in flight before senders wait for fan-out again
+MAX_BACKGROUND_BROADCASTS = 1000
+
+# Unread counts stop at this many messages; clients show it as "99+"
+UNREAD_COUNT_CAP = 100
+
+# Seconds a conversation's participant names and ride driver are reused
+# between messages; membership itself is always checked against the database
+ROSTER_CACHE_TTL_SECONDS = 300
+
+# Upper bound on cached rosters before the cache is reset
+ROSTER_CACHE_MAX_SIZE = 10000
+
+
+if HAS_MSGSPEC:
+
+    class SenderOut(msgspec.Struct):
+        id: int
+        name: str
+        is_driver: bool
+
+    class MessagePayload(msgspec.Struct, omit_defaults=True):
+        id: int
+        conversation_id: int
+        content: str
+        sent_at: str
+        message_type: str
+        is_system_message: bool
+        sender: SenderOut
+        metadata: Optional[Dict[str, Any]] = None
+
+    class Envelope(msgspec.Struct):
+        type: str
+        message: MessagePayload
+
+    _msgspec_encoder = msgspec.json.Encoder()
+
+
+def _new_message_event(
+    message_id: int,
+    conversation_id: int,
+    content: str,
+    sent_at: str,
+    message_type: str,
+    is_system_message: bool,
+    sender_id: int,
+    sender_name: str,
+    sender_is_driver: bool,
+    metadata: Optional[Dict[str, Any]] = None,
+) -> Any:
+    """Build the "new_message" WebSocket event, as msgspec structs when available"""
+    if HAS_MSGSPEC:
+        return Envelope(
+            type="new_message",
+            message=MessagePayload(
+                id=message_id,
+                conversation_id=conversation_id,
+                content=content,
+                sent_at=sent_at,
+                message_type=message_type,
+                is_system_message=is_system_message,
+                sender=SenderOut(
+                    id=sender_id, name=sender_name, is_driver=sender_is_driver
+                ),
+                metadata=metadata,
+            ),
+        )
+
+    message = {
+        "id": message_id,
+        "conversation_id": conversation_id,
+        "content": content,
+        "sent_at": sent_at,
+        "message_type": message_type,
+        "is_system_message": is_system_message,
+        "sender": {
+            "id": sender_id,
+            "name": sender_name,
+            "is_driver": sender_is_driver,
+        },
+    }
+    if metadata is not None:
+        message["metadata"] = metadata
+    return {"type": "new_message", "message": message}
+
+
+def _serialize_message(message: Any) -> str:
+    """Serialize a WebSocket message once, with msgspec or orjson when installed"""
+    if HAS_MSGSPEC:
+        return _msgspec_encoder.encode(message).decode()
+    if HAS_ORJSON:
+        return orjson.dumps(message).decode()
+    return json.dumps(message)
+
 
 class ConnectionManager:
     """Manages WebSocket connections for real-time messaging"""
@@ -22,6 +144,11 @@ class ConnectionManager:
         self.active_connections: Dict[int, List[WebSocket]] = {}
         # Map of user_id to set of active conversation_ids
         self.user_conversations: Dict[int, Set[int]] = {}
+        # Map of conversation_id to (user_id, websocket) pairs of its active users,
+        # so a broadcast walks a single list
+        self.conversation_sockets: Dict[int, List[Tuple[int, WebSocket]]] = {}
+        # Broadcasts still running after their sender returned
+        self._background_tasks: Set[asyncio.Task] = set()
 
     async def connect(self, websocket: WebSocket, user_id: int):
         """Connect a user's WebSocket"""
@@ -29,45 +156,108 @@ class ConnectionManager:
         if user_id not in self.active_connections:
             self.active_connections[user_id] = []
         self.active_connections[user_id].append(websocket)
+        for conversation_id in self.user_conversations.get(user_id, ()):
+            self.conversation_sockets.setdefault(conversation_id, []).append(
+                (user_id, websocket)
+            )
         logger.info(
             f"User {user_id} connected to messaging. Active connections: {len(self.active_connections)}"
         )
 
     def disconnect(self, websocket: WebSocket, user_id: int):
         """Disconnect a user's WebSocket"""
-        if user_id in self.active_connections:
+        # The socket may already have been pruned after a failed send
+        if websocket in self.active_connections.get(user_id, ()):
             self.active_connections[user_id].remove(websocket)
             if not self.active_connections[user_id]:
                 del self.active_connections[user_id]
+            for conversation_id in self.user_conversations.get(user_id, ()):
+                self._drop_sockets(conversation_id, lambda entry: entry[1] is websocket)
             logger.info(
                 f"User {user_id} disconnected from messaging. Remaining connections: {len(self.active_connections)}"
             )
 
-    async def send_personal_message(self, message: Dict[str, Any], user_id: int):
-        """Send a message to a specific user"""
+    async def send_personal_message(self, payload: str, user_id: int):
+        """Send an already serialized message to a specific user"""
         if user_id in self.active_connections:
-            for connection in self.active_connections[user_id]:
+            for connection in list(self.active_connections[user_id]):
                 try:
-                    await connection.send_text(json.dumps(message))
+                    await connection.send_text(payload)
                 except Exception as e:
                     logger.error(f"Error sending message to user {user_id}: {str(e)}")
+                    self.disconnect(connection, user_id)
 
     async def send_conversation_message(
         self,
-        message: Dict[str, Any],
+        message: Any,
         conversation_id: int,
         exclude_user_id: Optional[int] = None,
     ):
         """Send a message to all users in a conversation except the excluded user"""
-        for user_id, conversations in self.user_conversations.items():
-            if user_id != exclude_user_id and conversation_id in conversations:
-                await self.send_personal_message(message, user_id)
+        # Serialize once for every recipient
+        payload = _serialize_message(message)
+        targets = []
+        # Iterate over a copy; pruning closed sockets edits the index
+        for user_id, connection in list(
+            self.conversation_sockets.get(conversation_id, ())
+        ):
+            if user_id == exclude_user_id:
+                continue
+            if connection.client_state == WebSocketState.CONNECTED:
+                targets.append((user_id, connection))
+            else:
+                # Closed without a disconnect event; stop tracking it now
+                self.disconnect(connection, user_id)
+
+        # Send concurrently in batches, yielding to the event loop between them
+        for start in range(0, len(targets), BROADCAST_BATCH_SIZE):
+            batch = targets[start : start + BROADCAST_BATCH_SIZE]
+            results = await asyncio.gather(
+                *(connection.send_text(payload) for _, connection in batch),
+                return_exceptions=True,
+            )
+            for (user_id, connection), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Error sending message to user {user_id}: {result}")
+                    self.disconnect(connection, user_id)
+            await asyncio.sleep(0)
+
+    async def broadcast_conversation_message(
+        self,
+        message: Any,
+        conversation_id: int,
+        exclude_user_id: Optional[int] = None,
+    ):
+        """Fan a conversation message out in the background instead of awaiting it"""
+        broadcast = self.send_conversation_message(
+            message, conversation_id, exclude_user_id=exclude_user_id
+        )
+        # Apply backpressure rather than letting pending broadcasts pile up
+        if len(self._background_tasks) >= MAX_BACKGROUND_BROADCASTS:
+            await broadcast
+            return
+
+        task = asyncio.create_task(broadcast)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._broadcast_done)
+
+    def _broadcast_done(self, task: asyncio.Task):
+        """Forget a finished broadcast and log it if it failed"""
+        self._background_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Error broadcasting conversation message: {task.exception()}")
 
     def register_conversation(self, user_id: int, conversation_id: int):
         """Register a user as active in a conversation"""
         if user_id not in self.user_conversations:
             self.user_conversations[user_id] = set()
+        elif conversation_id in self.user_conversations[user_id]:
+            return
         self.user_conversations[user_id].add(conversation_id)
+        self.conversation_sockets.setdefault(conversation_id, []).extend(
+            (user_id, connection)
+            for connection in self.active_connections.get(user_id, ())
+        )
 
     def unregister_conversation(self, user_id: int, conversation_id: int):
         """Unregister a user from a conversation"""
@@ -76,10 +266,38 @@ class ConnectionManager:
             if not self.user_conversations[user_id]:
                 del self.user_conversations[user_id]
 
+        self._drop_sockets(conversation_id, lambda entry: entry[0] == user_id)
+
+    def _drop_sockets(self, conversation_id: int, predicate):
+        """Remove a conversation's socket entries matching predicate"""
+        sockets = self.conversation_sockets.get(conversation_id)
+        if sockets is None:
+            return
+        sockets[:] = [entry for entry in sockets if not predicate(entry)]
+        if not sockets:
+            del self.conversation_sockets[conversation_id]
+
 
 # Create a singleton connection manager
 connection_manager = ConnectionManager()
 
+# conversation_id -> participant names and ride driver, used on every send.
+# Events only fire in the worker that made the change, so this holds display
+# data only and never decides who may post
+_roster_cache = TTLCache(ROSTER_CACHE_TTL_SECONDS, ROSTER_CACHE_MAX_SIZE)
+
+
+@event.listens_for(Conversation.participants, "append")
+@event.listens_for(Conversation.participants, "remove")
+def _invalidate_roster_on_participant_change(target, value, initiator):
+    _roster_cache.invalidate(target.id)
+
+
+@event.listens_for(Conversation, "after_update")
+@event.listens_for(Conversation, "after_delete")
+def _invalidate_roster_on_conversation_change(mapper, connection, target):
+    _roster_cache.invalidate(target.id)
+
 
 class MessagingService:
     """Service for handling in-app messaging between users"""
@@ -101,9 +319,16 @@ class MessagingService:
         Returns:
             List of conversation details with message previews
         """
-        # Find all conversations where user is a participant
+        # Find all conversations where user is a participant, loading the
+        # participants and ride for the whole page up front
         conversations = (
             self.db.query(Conversation)
+            .options(
+                selectinload(Conversation.participants),
+                joinedload(Conversation.ride).options(
+                    joinedload(Ride.starting_hub), joinedload(Ride.destination_obj)
+                ),
+            )
             .filter(Conversation.participants.any(id=user_id))
             .filter(Conversation.is_active == True)
             .order_by(Conversation.created_at.desc())
@@ -112,77 +337,14 @@ class MessagingService:
             .all()
         )
 
-        result = []
-        for conversation in conversations:
-            # Get the latest message for this conversation
-            latest_message = (
-                self.db.query(Message)
-                .filter(Message.conversation_id == conversation.id)
-                .order_by(Message.sent_at.desc())
-                .first()
-            )
-
-            # Get unread count for this user in this conversation
-            unread_count = (
-                self.db.query(Message)
-                .filter(
-                    Message.conversation_id == conversation.id,
-                    Message.sender_id != user_id,
-                    Message.read_at == None,
-                )
-                .count()
-            )
-
-            # Format other participants' info
-            other_participants = [
-                {
-                    "id": p.id,
-                    "name": f"{p.first_name} {p.last_name}",
-                    "is_driver": (
-                        True
-                        if conversation.ride and conversation.ride.driver_id == p.id
-                        else False
-                    ),
-                }
-                for p in conversation.participants
-                if p.id != user_id
-            ]
-
-            # Build conversation info
-            conv_info = {
-                "id": conversation.id,
-                "title": conversation.title
-                or self._generate_conversation_title(conversation, user_id),
-                "type": conversation.conversation_type,
-                "created_at": conversation.created_at.isoformat(),
-                "ride_id": conversation.ride_id,
-                "other_participants": other_participants,
-                "unread_count": unread_count,
-                "last_message": (
-                    {
-                        "content": latest_message.content if latest_message else None,
-                        "sender_id": (
-                            latest_message.sender_id if latest_message else None
-                        ),
-                        "sent_at": (
-                            latest_message.sent_at.isoformat()
-                            if latest_message
-                            else None
-                        ),
-                        "is_system_message": (
-                            latest_message.is_system_message
-                            if latest_message
-                            else False
-                        ),
-                    }
-                    if latest_message
-                    else None
-                ),
-            }
-
-            result.append(conv_info)
+        # Latest message and unread count for every conversation in one query each
+        conversation_ids = [conversation.id for conversation in conversations]
+        latest_messages = self._get_latest_messages(conversation_ids)
+        unread_counts = self._get_unread_counts(conversation_ids, user_id)
 
-        return result
+        return self._format_conversations_bulk(
+            conversations, latest_messages, unread_counts, user_id
+        )
 
     def get_conversation_messages(
         self, conversation_id: int, user_id: int, skip: int = 0, limit: int = 50
@@ -202,6 +364,7 @@ class MessagingService:
         # Check if user is a participant in this conversation
         conversation = (
             self.db.query(Conversation)
+            .options(joinedload(Conversation.ride))
             .filter(
                 Conversation.id == conversation_id,
                 Conversation.participants.any(id=user_id),
@@ -214,9 +377,15 @@ class MessagingService:
                 status_code=403, detail="User is not a participant in this conversation"
             )
 
+        # Update read status for messages from other users first, so the
+        # commit does not expire the messages and senders loaded below
+        now = datetime.utcnow()
+        self._mark_messages_as_read(conversation_id, user_id, now)
+
         # Get messages with sender info, oldest first
         messages = (
             self.db.query(Message)
+            .options(joinedload(Message.sender))
             .filter(Message.conversation_id == conversation_id)
             .order_by(Message.sent_at.desc())
             .offset(skip)
@@ -224,19 +393,23 @@ class MessagingService:
             .all()
         )
 
-        # Update read status for messages from other users
-        self._mark_messages_as_read(conversation_id, user_id)
-
-        # Format messages for response
+        # Format messages for response; messages just marked read all share
+        # the same read_at, so format it once
+        now_iso = now.isoformat()
         result = []
         for message in messages:
-            sender = self.db.query(User).filter(User.id == message.sender_id).first()
+            sender = message.sender
+            read_at = message.read_at
 
             msg_data = {
                 "id": message.id,
                 "content": message.content,
                 "sent_at": message.sent_at.isoformat(),
-                "read_at": message.read_at.isoformat() if message.read_at else None,
+                "read_at": (
+                    now_iso
+                    if read_at == now
+                    else read_at.isoformat() if read_at else None
+                ),
                 "is_system_message": message.is_system_message,
                 "message_type": message.message_type,
                 "metadata": json.loads(message.metadata) if message.metadata else None,
@@ -277,18 +450,12 @@ class MessagingService:
         Returns:
             Details of the sent message
         """
-        # Check if user is a participant
-        conversation = (
-            self.db.query(Conversation)
-            .filter(
-                Conversation.id == conversation_id,
-                Conversation.participants.any(id=user_id),
-                Conversation.is_active == True,
-            )
-            .first()
+        # Database work runs in a worker thread so a slow query does not stall
+        # the event loop (and every WebSocket broadcast with it)
+        roster = await run_in_threadpool(
+            self._get_sender_roster, conversation_id, user_id
         )
-
-        if not conversation:
+        if not roster:
             raise HTTPException(
                 status_code=403, detail="User cannot send messages to this conversation"
             )
@@ -297,57 +464,51 @@ class MessagingService:
         metadata_json = (
             json.dumps(message_data.metadata) if message_data.metadata else None
         )
+        sent_at = datetime.utcnow()
         new_message = Message(
             conversation_id=conversation_id,
             sender_id=user_id,
             content=message_data.content,
             message_type=message_data.message_type,
             metadata=metadata_json,
-            sent_at=datetime.utcnow(),
+            sent_at=sent_at,
             is_system_message=False,
         )
 
-        self.db.add(new_message)
-        self.db.commit()
-        self.db.refresh(new_message)
-
-        # Format for WebSocket notification
-        sender = self.db.query(User).filter(User.id == user_id).first()
-
-        message_notification = {
-            "type": "new_message",
-            "message": {
-                "id": new_message.id,
-                "conversation_id": conversation_id,
-                "content": new_message.content,
-                "sent_at": new_message.sent_at.isoformat(),
-                "message_type": new_message.message_type,
-                "metadata": message_data.metadata,
-                "is_system_message": new_message.is_system_message,
-                "sender": {
-                    "id": sender.id,
-                    "name": f"{sender.first_name} {sender.last_name}",
-                    "is_driver": (
-                        True
-                        if conversation.ride
-                        and conversation.ride.driver_id == sender.id
-                        else False
-                    ),
-                },
-            },
-        }
+        message_id, message_type = await run_in_threadpool(
+            self._store_message, new_message
+        )
 
-        # Send real-time notification to all participants except sender
-        await connection_manager.send_conversation_message(
+        # Format for WebSocket notification; the timestamp string is shared
+        # with the HTTP response
+        sender = roster["participants"][user_id]
+        sent_at_iso = sent_at.isoformat()
+
+        message_notification = _new_message_event(
+            message_id,
+            conversation_id,
+            message_data.content,
+            sent_at_iso,
+            message_type,
+            is_system_message=False,
+            sender_id=user_id,
+            sender_name=f"{sender['first_name']} {sender['last_name']}",
+            sender_is_driver=roster["driver_id"] == user_id,
+            metadata=message_data.metadata,
+        )
+
+        # Send real-time notification to all participants except sender without
+        # holding the HTTP response until every subscriber has received it
+        await connection_manager.broadcast_conversation_message(
             message_notification, conversation_id, exclude_user_id=user_id
         )
 
         return {
-            "id": new_message.id,
+            "id": message_id,
             "conversation_id": conversation_id,
-            "content": new_message.content,
-            "sent_at": new_message.sent_at.isoformat(),
-            "message_type": new_message.message_type,
+            "content": message_data.content,
+            "sent_at": sent_at_iso,
+            "message_type": message_type,
             "metadata": message_data.metadata,
             "sender_id": user_id,
             "status": "sent",
@@ -380,61 +541,87 @@ class MessagingService:
             )
 
         # For ride-related conversations, verify the ride exists
+        welcome_content = None
         if data.ride_id:
-            ride = self.db.query(Ride).filter(Ride.id == data.ride_id).first()
+            ride = (
+                self.db.query(Ride)
+                .options(
+                    joinedload(Ride.starting_hub), joinedload(Ride.destination_obj)
+                )
+                .filter(Ride.id == data.ride_id)
+                .first()
+            )
             if not ride:
                 raise HTTPException(status_code=404, detail="Ride not found")
 
             # Check if a conversation already exists for this ride
             existing_conv = (
                 self.db.query(Conversation)
+                .options(joinedload(Conversation.ride))
                 .filter(Conversation.ride_id == data.ride_id)
                 .first()
             )
 
             if existing_conv:
-                # Add any missing participants
-                current_participant_ids = {p.id for p in existing_conv.participants}
-                missing_participants = existing_user_ids - current_participant_ids
-
-                if missing_participants:
-                    missing_users = (
-                        self.db.query(User)
-                        .filter(User.id.in_(missing_participants))
-                        .all()
+                # Add any missing participants straight into the association
+                # table; rows that already exist are skipped by the database
+                if self.db.get_bind().dialect.name == "postgresql":
+                    insert = postgresql_insert
+                else:
+                    insert = sqlite_insert
+
+                result = self.db.execute(
+                    insert(conversation_participants)
+                    .values(
+                        [
+                            {"conversation_id": existing_conv.id, "user_id": uid}
+                            for uid in existing_user_ids
+                        ]
                     )
-                    existing_conv.participants.extend(missing_users)
+                    .on_conflict_do_nothing()
+                )
+                if result.rowcount:
+                    # Core inserts bypass the participants collection events
+                    _roster_cache.invalidate(existing_conv.id)
                     self.db.commit()
 
                 # Return existing conversation
                 return self._format_conversation(existing_conv, creator_id)
 
+        # Build the title and welcome text while the ride is loaded; commits
+        # expire it. Ride titles do not depend on the viewer, so store them
+        # rather than rebuilding them on every listing
+        title = data.title
+        if data.ride_id:
+            title = title or self._ride_title(ride)
+            if data.conversation_type == "ride":
+                welcome_content = self._ride_welcome_text(ride)
+
         # Create the conversation
         participants = (
             self.db.query(User).filter(User.id.in_(all_participant_ids)).all()
         )
 
+        now = datetime.utcnow()
         new_conversation = Conversation(
-            title=data.title,
+            title=title,
             ride_id=data.ride_id,
             conversation_type=data.conversation_type,
-            created_at=datetime.utcnow(),
+            created_at=now,
             is_active=True,
             participants=participants,
         )
 
         self.db.add(new_conversation)
         self.db.commit()
-        self.db.refresh(new_conversation)
 
         # If it's a ride conversation, add a system message
-        if data.ride_id and data.conversation_type == "ride":
-            ride = self.db.query(Ride).filter(Ride.id == data.ride_id).first()
+        if welcome_content:
             welcome_message = Message(
                 conversation_id=new_conversation.id,
                 sender_id=creator_id,  # System messages use the creator as sender
-                content=f"Welcome to the ride chat for your journey from {ride.starting_hub.name} to {ride.destination.name} on {ride.departure_time.strftime('%B %d, %Y')}.",
-                sent_at=datetime.utcnow(),
+                content=welcome_content,
+                sent_at=now,
                 is_system_message=True,
             )
             self.db.add(welcome_message)
@@ -463,6 +650,7 @@ class MessagingService:
         # Check if a direct conversation already exists
         existing_conv = (
             self.db.query(Conversation)
+            .options(joinedload(Conversation.ride))
             .filter(
                 Conversation.conversation_type == "direct",
                 Conversation.participants.any(id=user_id),
@@ -489,7 +677,6 @@ class MessagingService:
 
         self.db.add(new_conversation)
         self.db.commit()
-        self.db.refresh(new_conversation)
 
         return self._format_conversation(new_conversation, user_id)
 
@@ -505,20 +692,31 @@ class MessagingService:
             Conversation details
         """
         # Check if ride exists
-        ride = self.db.query(Ride).filter(Ride.id == ride_id).first()
+        ride = (
+            self.db.query(Ride)
+            .options(joinedload(Ride.starting_hub), joinedload(Ride.destination_obj))
+            .filter(Ride.id == ride_id)
+            .first()
+        )
         if not ride:
             raise HTTPException(status_code=404, detail="Ride not found")
 
         # Check if conversation already exists
         existing_conv = (
             self.db.query(Conversation)
+            .options(joinedload(Conversation.ride))
             .filter(Conversation.ride_id == ride_id, Conversation.is_active == True)
             .first()
         )
 
         if existing_conv:
-            # Make sure creator is a participant
-            if not any(p.id == creator_id for p in existing_conv.participants):
+            # Make sure creator is a participant, without loading the collection
+            is_member = self.db.query(
+                self.db.query(conversation_participants)
+                .filter_by(conversation_id=existing_conv.id, user_id=creator_id)
+                .exists()
+            ).scalar()
+            if not is_member:
                 user = self.db.query(User).filter(User.id == creator_id).first()
                 existing_conv.participants.append(user)
                 self.db.commit()
@@ -544,26 +742,29 @@ class MessagingService:
 
         participants = self.db.query(User).filter(User.id.in_(participant_ids)).all()
 
+        # Build the welcome text while the ride is loaded; commits expire it
+        welcome_content = self._ride_welcome_text(ride)
+
         # Create conversation
+        now = datetime.utcnow()
         new_conversation = Conversation(
             title=f"Ride #{ride_id} Chat",
             ride_id=ride_id,
             conversation_type="ride",
-            created_at=datetime.utcnow(),
+            created_at=now,
             is_active=True,
             participants=participants,
         )
 
         self.db.add(new_conversation)
         self.db.commit()
-        self.db.refresh(new_conversation)
 
         # Add welcome message
         welcome_message = Message(
             conversation_id=new_conversation.id,
             sender_id=creator_id,
-            content=f"Welcome to the ride chat for your journey from {ride.starting_hub.name} to {ride.destination.name} on {ride.departure_time.strftime('%B %d, %Y')}.",
-            sent_at=datetime.utcnow(),
+            content=welcome_content,
+            sent_at=now,
             is_system_message=True,
         )
         self.db.add(welcome_message)
@@ -584,137 +785,290 @@ class MessagingService:
         Returns:
             Message details
         """
-        conversation = (
-            self.db.query(Conversation)
-            .filter(Conversation.id == conversation_id)
-            .first()
-        )
-        if not conversation:
-            raise HTTPException(status_code=404, detail="Conversation not found")
-
-        # Use first participant as "sender" for system messages
-        sender_id = conversation.participants[0].id if conversation.participants else 1
+        sender_id = await run_in_threadpool(self._get_system_sender_id, conversation_id)
 
+        sent_at = datetime.utcnow()
         system_message = Message(
             conversation_id=conversation_id,
             sender_id=sender_id,
             content=content,
-            sent_at=datetime.utcnow(),
+            sent_at=sent_at,
             is_system_message=True,
         )
 
-        self.db.add(system_message)
-        self.db.commit()
-        self.db.refresh(system_message)
+        message_id, _ = await run_in_threadpool(self._store_message, system_message)
 
         # Notify all participants
-        message_notification = {
-            "type": "new_message",
-            "message": {
-                "id": system_message.id,
-                "conversation_id": conversation_id,
-                "content": content,
-                "sent_at": system_message.sent_at.isoformat(),
-                "message_type": "text",
-                "is_system_message": True,
-                "sender": {"id": sender_id, "name": "System", "is_driver": False},
-            },
-        }
+        sent_at_iso = sent_at.isoformat()
+        message_notification = _new_message_event(
+            message_id,
+            conversation_id,
+            content,
+            sent_at_iso,
+            "text",
+            is_system_message=True,
+            sender_id=sender_id,
+            sender_name="System",
+            sender_is_driver=False,
+        )
 
-        await connection_manager.send_conversation_message(
+        await connection_manager.broadcast_conversation_message(
             message_notification, conversation_id
         )
 
         return {
-            "id": system_message.id,
+            "id": message_id,
             "conversation_id": conversation_id,
             "content": content,
-            "sent_at": system_message.sent_at.isoformat(),
+            "sent_at": sent_at_iso,
             "is_system_message": True,
         }
 
-    def _mark_messages_as_read(self, conversation_id: int, user_id: int) -> None:
-        """Mark all unread messages from other users as read"""
-        unread_messages = (
-            self.db.query(Message)
+    def _store_message(self, message: Message) -> Tuple[int, str]:
+        """Insert a message and return its id and message type"""
+        # Flushing assigns the id; everything else is known client-side, so the
+        # row does not need to be read back (commit expires the instance)
+        self.db.add(message)
+        self.db.flush()
+        stored = (message.id, message.message_type)
+        self.db.commit()
+        return stored
+
+    def _get_system_sender_id(self, conversation_id: int) -> int:
+        """Pick the user system messages in a conversation are attributed to"""
+        conversation = (
+            self.db.query(Conversation)
+            .filter(Conversation.id == conversation_id)
+            .first()
+        )
+        if not conversation:
+            raise HTTPException(status_code=404, detail="Conversation not found")
+
+        # Use first participant as "sender" for system messages
+        return conversation.participants[0].id if conversation.participants else 1
+
+    def _get_sender_roster(self, conversation_id: int, user_id: int) -> Optional[Dict]:
+        """
+        Check that a user may post to a conversation and get its roster
+
+        Membership and is_active are checked live with one EXISTS query, so a
+        removal or deactivation made by another worker applies immediately.
+
+        Returns:
+            The conversation roster, or None if the user cannot post to it
+        """
+        can_send = self.db.query(
+            self.db.query(conversation_participants)
+            .join(
+                Conversation,
+                Conversation.id == conversation_participants.c.conversation_id,
+            )
             .filter(
+                conversation_participants.c.conversation_id == conversation_id,
+                conversation_participants.c.user_id == user_id,
+                Conversation.is_active == True,
+            )
+            .exists()
+        ).scalar()
+        if not can_send:
+            return None
+
+        roster = self._get_conversation_roster(conversation_id)
+        if roster and user_id not in roster["participants"]:
+            # Joined through another worker since the roster was cached
+            _roster_cache.invalidate(conversation_id)
+            roster = self._get_conversation_roster(conversation_id)
+        return roster
+
+    def _get_conversation_roster(self, conversation_id: int) -> Optional[Dict]:
+        """
+        Get a conversation's participant names and ride driver, cached for a
+        short TTL
+
+        Returns:
+            Dict with driver_id and participants keyed by user id, or None if
+            the conversation does not exist
+        """
+        roster = _roster_cache.get(conversation_id)
+        if roster is not None:
+            return roster
+
+        conversation = (
+            self.db.query(Conversation)
+            .options(
+                selectinload(Conversation.participants),
+                joinedload(Conversation.ride),
+            )
+            .filter(Conversation.id == conversation_id)
+            .first()
+        )
+        if not conversation:
+            return None
+
+        roster = {
+            "driver_id": conversation.ride.driver_id if conversation.ride else None,
+            "participants": {
+                p.id: {"id": p.id, "first_name": p.first_name, "last_name": p.last_name}
+                for p in conversation.participants
+            },
+        }
+        _roster_cache.set(conversation_id, roster)
+        return roster
+
+    def _get_latest_messages(self, conversation_ids: List[int]) -> Dict[int, Any]:
+        """Get the most recent message of each conversation, keyed by conversation"""
+        if not conversation_ids:
+            return {}
+
+        ranked = select(
+            Message.conversation_id,
+            Message.content,
+            Message.sender_id,
+            Message.sent_at,
+            Message.is_system_message,
+            func.row_number()
+            .over(
+                partition_by=Message.conversation_id,
+                order_by=Message.sent_at.desc(),
+            )
+            .label("position"),
+        ).where(Message.conversation_id.in_(conversation_ids))
+        ranked = ranked.subquery()
+
+        rows = self.db.execute(select(ranked).where(ranked.c.position == 1)).all()
+        return {row.conversation_id: row for row in rows}
+
+    def _get_unread_counts(
+        self, conversation_ids: List[int], user_id: int
+    ) -> Dict[int, int]:
+        """
+        Count unread messages from other users, keyed by conversation
+
+        Each count stops at UNREAD_COUNT_CAP, so a long-idle conversation costs
+        a bounded index range scan rather than counting every unread row.
+        """
+        if not conversation_ids:
+            return {}
+
+        counts = []
+        for conversation_id in conversation_ids:
+            unread = (
+                select(Message.id)
+                .where(
+                    Message.conversation_id == conversation_id,
+                    Message.sender_id != user_id,
+                    Message.read_at == None,
+                )
+                .limit(UNREAD_COUNT_CAP)
+                .subquery()
+            )
+            counts.append(
+                select(
+                    literal(conversation_id).label("conversation_id"),
+                    func.count().label("unread"),
+                ).select_from(unread)
+            )
+
+        return dict(self.db.execute(union_all(*counts)).all())
+
+    def _mark_messages_as_read(
+        self, conversation_id: int, user_id: int, read_at: Optional[datetime] = None
+    ) -> None:
+        """Mark all unread messages from other users as read"""
+        # One UPDATE statement instead of loading and flushing each message
+        result = self.db.execute(
+            update(Message)
+            .where(
                 Message.conversation_id == conversation_id,
                 Message.sender_id != user_id,
                 Message.read_at == None,
             )
-            .all()
+            .values(read_at=read_at or datetime.utcnow())
+            .execution_options(synchronize_session=False)
         )
 
-        read_time = datetime.utcnow()
-        for message in unread_messages:
-            message.read_at = read_time
-
-        if unread_messages:
+        if result.rowcount:
             self.db.commit()
 
     def _format_conversation(
         self, conversation: Conversation, user_id: int
     ) -> Dict[str, Any]:
         """Format conversation details for API response"""
-        # Get latest message
-        latest_message = (
-            self.db.query(Message)
-            .filter(Message.conversation_id == conversation.id)
-            .order_by(Message.sent_at.desc())
-            .first()
-        )
+        return self._format_conversations_bulk(
+            [conversation],
+            self._get_latest_messages([conversation.id]),
+            self._get_unread_counts([conversation.id], user_id),
+            user_id,
+        )[0]
+
+    def _format_conversations_bulk(
+        self,
+        conversations: List[Conversation],
+        latest_messages: Dict[int, Any],
+        unread_counts: Dict[int, int],
+        user_id: int,
+    ) -> List[Dict[str, Any]]:
+        """
+        Format conversations for API response
 
-        # Get unread count
-        unread_count = (
-            self.db.query(Message)
-            .filter(
-                Message.conversation_id == conversation.id,
-                Message.sender_id != user_id,
-                Message.read_at == None,
-            )
-            .count()
-        )
+        Args:
+            conversations: Conversations with participants and ride loaded
+            latest_messages: Latest message per conversation id
+            unread_counts: Unread message count per conversation id
+            user_id: ID of the user the conversations are formatted for
 
-        # Format participants
-        other_participants = [
-            {
-                "id": p.id,
-                "name": f"{p.first_name} {p.last_name}",
-                "is_driver": (
-                    True
-                    if conversation.ride and conversation.ride.driver_id == p.id
-                    else False
-                ),
-            }
-            for p in conversation.participants
-            if p.id != user_id
-        ]
+        Returns:
+            List of conversation details with message previews
+        """
+        result = []
+        for conversation in conversations:
+            latest_message = latest_messages.get(conversation.id)
+            driver_id = conversation.ride.driver_id if conversation.ride else None
 
-        return {
-            "id": conversation.id,
-            "title": conversation.title
-            or self._generate_conversation_title(conversation, user_id),
-            "type": conversation.conversation_type,
-            "created_at": conversation.created_at.isoformat(),
-            "ride_id": conversation.ride_id,
-            "participants_count": len(conversation.participants),
-            "other_participants": other_participants,
-            "unread_count": unread_count,
-            "last_message": (
+            # Format other participants' info
+            other_participants = [
                 {
-                    "content": latest_message.content if latest_message else None,
-                    "sender_id": latest_message.sender_id if latest_message else None,
-                    "sent_at": (
-                        latest_message.sent_at.isoformat() if latest_message else None
-                    ),
-                    "is_system_message": (
-                        latest_message.is_system_message if latest_message else False
+                    "id": p.id,
+                    "name": f"{p.first_name} {p.last_name}",
+                    "is_driver": driver_id == p.id,
+                }
+                for p in conversation.participants
+                if p.id != user_id
+            ]
+
+            result.append(
+                {
+                    "id": conversation.id,
+                    "title": conversation.title
+                    or self._generate_conversation_title(conversation, user_id),
+                    "type": conversation.conversation_type,
+                    "created_at": conversation.created_at.isoformat(),
+                    "ride_id": conversation.ride_id,
+                    "participants_count": len(conversation.participants),
+                    "other_participants": other_participants,
+                    "unread_count": unread_counts.get(conversation.id, 0),
+                    "last_message": (
+                        {
+                            "content": latest_message.content,
+                            "sender_id": latest_message.sender_id,
+                            "sent_at": latest_message.sent_at.isoformat(),
+                            "is_system_message": latest_message.is_system_message,
+                        }
+                        if latest_message
+                        else None
                     ),
                 }
-                if latest_message
-                else None
-            ),
-        }
+            )
+
+        return result
+
+    def _ride_welcome_text(self, ride: Ride) -> str:
+        """Welcome message posted when a ride conversation is created"""
+        return f"Welcome to the ride chat for your journey from {ride.starting_hub.name} to {ride.destination.name} on {ride.departure_time.strftime('%B %d, %Y')}."
+
+    def _ride_title(self, ride: Ride) -> str:
+        """Title of a conversation attached to a ride"""
+        return f"Ride from {ride.starting_hub.name} to {ride.destination.name}"
 
     def _generate_conversation_title(
         self, conversation: Conversation, user_id: int
@@ -723,9 +1077,9 @@ class MessagingService:
         if conversation.title:
             return conversation.title
 
+        # Legacy ride conversations created before titles were stored
         if conversation.ride_id:
-            ride = conversation.ride
-            return f"Ride from {ride.starting_hub.name} to {ride.destination.name}"
+            return self._ride_title(conversation.ride)
 
         if conversation.conversation_type == "direct":
             other_participant = next(
@@ -1,10 +1,16 @@
+import asyncio
 import json
 import logging
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 
-from sqlalchemy.orm import Session
+import httpx
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload, raiseload, selectinload
 
+from app.core.cache import TTLCache
+from app.core.config import settings
 from app.models.driver import DriverProfile, DriverVehicle
 from app.models.message import Conversation, ConversationMessage as Message, UserMessageSettings
 from app.models.ride import RideBooking
@@ -13,9 +19,69 @@ from app.models.vehicle import Vehicle
 
 logger = logging.getLogger(__name__)
 
+# Seconds a user's notifications_enabled flag is reused between notifications
+SETTINGS_CACHE_TTL_SECONDS = 60
+
+# Upper bound on cached flags before the cache is reset
+SETTINGS_CACHE_MAX_SIZE = 10000
+
+TWILIO_API_URL = "https://api.twilio.com/2010-04-01"
+
+# Seconds before a request to a notification provider gives up
+PROVIDER_TIMEOUT_SECONDS = 5.0
+
+# Idle provider connections kept open for reuse
+PROVIDER_MAX_KEEPALIVE_CONNECTIONS = 100
+
+# Shared by every notification so provider connections (and their TLS
+# handshakes) are reused; created on first use inside the running event loop
+_http_client: Optional[httpx.AsyncClient] = None
+
+# user_id -> notifications_enabled, shared across service instances
+_settings_cache = TTLCache(SETTINGS_CACHE_TTL_SECONDS, SETTINGS_CACHE_MAX_SIZE)
+
+
+@event.listens_for(UserMessageSettings, "after_insert")
+@event.listens_for(UserMessageSettings, "after_update")
+@event.listens_for(UserMessageSettings, "after_delete")
+def _invalidate_cached_settings(mapper, connection, target):
+    _settings_cache.invalidate(target.user_id)
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Return the shared client used to call notification providers"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=PROVIDER_TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_keepalive_connections=PROVIDER_MAX_KEEPALIVE_CONNECTIONS
+            ),
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared provider client; called on application shutdown"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def _content_preview(content: str) -> str:
+    """First 50 characters of a message, with an ellipsis if it was cut"""
+    # Slicing one character past the limit avoids len() over long messages
+    preview = content[:51]
+    return preview[:50] + "..." if len(preview) > 50 else preview
+
 
 class NotificationService:
-    """Service for handling notifications"""
+    """
+    Service for handling notifications.
+    Database work in the async notify_* methods runs in a worker thread so a
+    slow query does not block the event loop.
+    """
 
     def __init__(self, db: Session):
         self.db = db
@@ -25,17 +91,17 @@ class NotificationService:
         Notify a user about a ride booking confirmation.
         Returns True if notification was sent successfully, False otherwise.
         """
-        booking = (
-            self.db.query(RideBooking).filter(RideBooking.id == booking_id).first()
+        booking = await run_in_threadpool(
+            self._get_booking_with_user_and_ride, booking_id
         )
         if not booking:
-            logger.error(f"Booking {booking_id} not found for notification")
+            logger.error("Booking %s not found for notification", booking_id)
             return False
 
-        user = self.db.query(User).filter(User.id == booking.passenger_id).first()
+        user = booking.user
         if not user:
             logger.error(
-                f"User {booking.passenger_id} not found for booking {booking_id}"
+                "User %s not found for booking %s", booking.passenger_id, booking_id
             )
             return False
 
@@ -80,17 +146,17 @@ class NotificationService:
         """
         Notify a user about a ride update (e.g., delay, cancellation).
         """
-        booking = (
-            self.db.query(RideBooking).filter(RideBooking.id == booking_id).first()
+        booking = await run_in_threadpool(
+            self._get_booking_with_user_and_ride, booking_id
         )
         if not booking:
-            logger.error(f"Booking {booking_id} not found for update notification")
+            logger.error("Booking %s not found for update notification", booking_id)
             return False
 
-        user = self.db.query(User).filter(User.id == booking.passenger_id).first()
+        user = booking.user
         if not user:
             logger.error(
-                f"User {booking.passenger_id} not found for booking {booking_id}"
+                "User %s not found for booking %s", booking.passenger_id, booking_id
             )
             return False
 
@@ -111,22 +177,55 @@ class NotificationService:
             user, f"Ride Update: {update_type}", message, push_notification
         )
 
+    def _get_message_with_recipients(self, message_id: int) -> Optional[Message]:
+        """Load a message with its sender, conversation and participants"""
+        # The notification helpers read everything from here; any other
+        # relationship access raises instead of quietly lazy loading
+        return (
+            self.db.query(Message)
+            .options(
+                joinedload(Message.sender),
+                selectinload(Message.conversation).selectinload(
+                    Conversation.participants
+                ),
+                raiseload("*"),
+            )
+            .filter(Message.id == message_id)
+            .first()
+        )
+
+    def _get_booking_with_user_and_ride(self, booking_id: int) -> Optional[RideBooking]:
+        """Load a booking together with its passenger and ride in one query"""
+        return (
+            self.db.query(RideBooking)
+            .options(
+                joinedload(RideBooking.user),
+                joinedload(RideBooking.ride),
+                raiseload("*"),
+            )
+            .filter(RideBooking.id == booking_id)
+            .first()
+        )
+
     async def notify_custom_message(
-        self, user_id: int, title: str, message: str
+        self, user_id: int, title: str, message: str, timestamp: Optional[str] = None
     ) -> bool:
         """
         Send a custom notification to a user.
+        Callers notifying many users at once can pass one shared timestamp.
         """
-        user = self.db.query(User).filter(User.id == user_id).first()
+        user = await run_in_threadpool(
+            lambda: self.db.query(User).filter(User.id == user_id).first()
+        )
         if not user:
-            logger.error(f"User {user_id} not found for custom notification")
+            logger.error("User %s not found for custom notification", user_id)
             return False
 
         notification_data = {
             "type": "custom",
             "title": title,
             "message": message,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "timestamp": timestamp or datetime.now(timezone.utc).isoformat(),
         }
 
         push_notification = self.format_notification_for_push(
@@ -139,74 +238,71 @@ class NotificationService:
         """
         Notify a user about a new message.
         """
-        message = self.db.query(Message).filter(Message.id == message_id).first()
+        message = await run_in_threadpool(
+            self._get_message_with_recipients, message_id
+        )
         if not message:
-            logger.error(f"Message {message_id} not found for notification")
+            logger.error("Message %s not found for notification", message_id)
             return False
 
-        # Get the conversation
-        conversation = (
-            self.db.query(Conversation)
-            .filter(Conversation.id == message.conversation_id)
-            .first()
-        )
-        if not conversation:
+        if not message.conversation:
             logger.error(
-                f"Conversation {message.conversation_id} not found for message {message_id}"
+                "Conversation %s not found for message %s",
+                message.conversation_id,
+                message_id,
             )
             return False
 
-        # Get the sender
-        sender = self.db.query(User).filter(User.id == message.sender_id).first()
+        sender = message.sender
         if not sender:
             logger.error(
-                f"Sender {message.sender_id} not found for message {message_id}"
+                "Sender %s not found for message %s", message.sender_id, message_id
             )
             return False
 
-        # Create notification data
-        notification_data = self.create_message_notification(message)
-
         # Get recipients (all participants except sender)
-        recipients = self.get_notification_recipients(message)
-
-        success = True
-        for recipient in recipients:
-            # Format notification for this recipient
-            push_notification = self.format_notification_for_push(
-                title=f"New message from {sender.first_name} {sender.last_name}",
-                body=message.content[:50]
-                + ("..." if len(message.content) > 50 else ""),
-                data=notification_data,
-            )
+        recipients = await run_in_threadpool(self.get_notification_recipients, message)
+        if not recipients:
+            logger.debug("No recipients to notify for message %s", message_id)
+            return True
 
-            # Send notification
-            if not await self._send_notification(
-                recipient,
-                f"New message from {sender.first_name} {sender.last_name}",
-                message.content,
-                push_notification,
-            ):
-                success = False
+        # Create notification data; the preview doubles as the push body
+        preview = _content_preview(message.content)
+        notification_data = self.create_message_notification(message, preview)
 
-        return success
+        # The notification is the same for every recipient, so build it once
+        title = f"New message from {sender.first_name} {sender.last_name}"
+        push_notification = self.format_notification_for_push(
+            title=title,
+            body=preview,
+            data=notification_data,
+        )
 
-    def create_message_notification(self, message: Message) -> Dict[str, Any]:
+        # Send to all recipients concurrently rather than one after another
+        results = await asyncio.gather(
+            *(
+                self._send_notification(
+                    recipient, title, message.content, push_notification
+                )
+                for recipient in recipients
+            ),
+            return_exceptions=True,
+        )
+
+        return all(result is True for result in results)
+
+    def create_message_notification(
+        self, message: Message, preview: Optional[str] = None
+    ) -> Dict[str, Any]:
         """Create a notification for a new message"""
-        # Get the sender
-        sender = self.db.query(User).filter(User.id == message.sender_id).first()
+        sender = message.sender
         if not sender:
-            logger.error(f"Sender not found for message {message.id}")
+            logger.error("Sender not found for message %s", message.id)
             return {}
 
-        # Get the conversation
-        conversation = (
-            self.db.query(Conversation)
-            .filter(Conversation.id == message.conversation_id)
-            .first()
-        )
+        conversation = message.conversation
         if not conversation:
-            logger.error(f"Conversation not found for message {message.id}")
+            logger.error("Conversation not found for message %s", message.id)
             return {}
 
         # Create notification data
@@ -216,18 +312,13 @@ class NotificationService:
             "conversation_id": message.conversation_id,
             "sender_id": message.sender_id,
             "sender_name": f"{sender.first_name} {sender.last_name}",
-            "content_preview": message.content[:50]
-            + ("..." if len(message.content) > 50 else ""),
-            "message_type": (
-                message.message_type if hasattr(message, "message_type") else "text"
+            "content_preview": (
+                preview if preview is not None else _content_preview(message.content)
             ),
+            "message_type": message.message_type,
             "sent_at": message.sent_at.isoformat(),
             "conversation_title": conversation.title or "Direct Message",
-            "conversation_type": (
-                conversation.conversation_type
-                if hasattr(conversation, "conversation_type")
-                else "direct"
-            ),
+            "conversation_type": conversation.conversation_type,
         }
 
         return notification_data
@@ -238,13 +329,17 @@ class NotificationService:
         booking_id: int,
         user_id: int,
         details: Dict[str, Any],
+        timestamp: Optional[str] = None,
     ) -> Dict[str, Any]:
-        """Create a notification for a ride update"""
+        """
+        Create a notification for a ride update.
+        Callers notifying many bookings at once can pass one shared timestamp.
+        """
         notification_data = {
             "type": notification_type,
             "booking_id": booking_id,
             "user_id": user_id,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "timestamp": timestamp or datetime.now(timezone.utc).isoformat(),
             "details": details,
         }
 
@@ -252,27 +347,50 @@ class NotificationService:
 
     def get_notification_recipients(self, message: Message) -> List[User]:
         """Get the list of users who should receive notifications for a message"""
-        # Get the conversation
-        conversation = (
-            self.db.query(Conversation)
-            .filter(Conversation.id == message.conversation_id)
-            .first()
-        )
+        conversation = message.conversation
         if not conversation:
-            logger.error(f"Conversation not found for message {message.id}")
+            logger.error("Conversation not found for message %s", message.id)
             return []
 
         # Get all participants except the sender
-        recipients = [
-            user
-            for user in conversation.participants
-            if user.id != message.sender_id and self.should_notify_user(user.id)
+        participants = [
+            user for user in conversation.participants if user.id != message.sender_id
         ]
+        if not participants:
+            return []
+
+        # Use cached notification flags and fetch the rest in one query; users
+        # without settings default to receiving notifications
+        enabled = {}
+        missing_ids = []
+        for user in participants:
+            flag = _settings_cache.get(user.id)
+            if flag is None:
+                missing_ids.append(user.id)
+            else:
+                enabled[user.id] = flag
 
-        return recipients
+        if missing_ids:
+            fetched = dict(
+                self.db.query(
+                    UserMessageSettings.user_id,
+                    UserMessageSettings.notifications_enabled,
+                )
+                .filter(UserMessageSettings.user_id.in_(missing_ids))
+                .all()
+            )
+            for user_id in missing_ids:
+                enabled[user_id] = fetched.get(user_id, True)
+                _settings_cache.set(user_id, enabled[user_id])
+
+        return [user for user in participants if enabled[user.id]]
 
     def should_notify_user(self, user_id: int) -> bool:
         """Check if a user should receive notifications"""
+        enabled = _settings_cache.get(user_id)
+        if enabled is not None:
+            return enabled
+
         # Get user's message settings
         settings = (
             self.db.query(UserMessageSettings)
@@ -281,10 +399,14 @@ class NotificationService:
         )
 
         # If no settings exist, default to sending notifications
-        if not settings:
-            return True
+        enabled = settings.notifications_enabled if settings else True
+        _settings_cache.set(user_id, enabled)
+        return enabled
 
-        return settings.notifications_enabled
+    @staticmethod
+    def invalidate_settings(user_id: int) -> None:
+        """Drop a user's cached notification flag, e.g. after a bulk update"""
+        _settings_cache.invalidate(user_id)
 
     def format_notification_for_push(
         self, title: str, body: str, data: Dict[str, Any]
@@ -304,78 +426,78 @@ class NotificationService:
         Currently logs messages; to be extended with real integrations.
         """
         try:
+            # Log lines use %-style arguments so nothing is formatted (or
+            # JSON-encoded) when INFO is filtered out
             # Placeholder for email notification (e.g., using SendGrid)
-            logger.info(f"Email notification to {user.email}: {title} - {message}")
+            logger.info("Email notification to %s: %s - %s", user.email, title, message)
 
             # Placeholder for SMS notification (e.g., using Twilio)
             if user.phone_number:
-                logger.info(f"SMS to {user.phone_number}: {title} - {message}")
+                logger.info("SMS to %s: %s - %s", user.phone_number, title, message)
 
             # Placeholder for push notification (e.g., using Firebase)
             if push_data:
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info(
+                        "Push notification to user %s: %s",
+                        user.id,
+                        json.dumps(push_data),
+                    )
+            else:
                 logger.info(
-                    f"Push notification to user {user.id}: {json.dumps(push_data)}"
+                    "Push notification to user %s: %s - %s", user.id, title, message
                 )
-            else:
-                logger.info(f"Push notification to user {user.id}: {title} - {message}")
 
-            # In a real implementation, integrate with:
-            # - Email: SendGrid, SMTP
-            # - SMS: Twilio
-            # - Push: Firebase Cloud Messaging
-            # Example (commented out):
-            # await self._send_email(user.email, title, message)
-            # await self._send_sms(user.phone_number, message)
-            # await self._send_push(user.id, title, message, push_data)
-
-            return True
+            # The channels are independent services, so deliver through them
+            # concurrently; one failing channel does not stop the others
+            channels = ["email"]
+            sends = [self._send_email(user.email, title, message)]
+            if user.phone_number:
+                channels.append("sms")
+                sends.append(self._send_sms(user.phone_number, message))
+            channels.append("push")
+            sends.append(self._send_push(user.id, title, message, push_data))
+
+            results = await asyncio.gather(*sends, return_exceptions=True)
+
+            success = True
+            for channel, result in zip(channels, results):
+                if isinstance(result, Exception):
+                    logger.error(
+                        "Failed to send %s notification to user %s: %s",
+                        channel,
+                        user.id,
+                        result,
+                    )
+                    success = False
+
+            return success
         except Exception as e:
-            logger.error(f"Failed to send notification to user {user.id}: {str(e)}")
+            logger.error("Failed to send notification to user %s: %s", user.id, e)
             return False
 
     # Implementation methods for integrations
     async def _send_email(self, email: str, title: str, message: str) -> None:
         """Send an email notification"""
-        # Implement with SendGrid or SMTP
-        # Example with SendGrid:
-        # from sendgrid import SendGridAPIClient
-        # from sendgrid.helpers.mail import Mail
-        #
-        # message = Mail(
-        #     from_email='noreply@rideshare.com',
-        #     to_emails=email,
-        #     subject=title,
-        #     html_content=f'<p>{message}</p>'
-        # )
-        #
-        # try:
-        #     sg = SendGridAPIClient(os.environ.get('SENDGRID_API_KEY'))
-        #     response = sg.send(message)
-        # except Exception as e:
-        #     logger.error(f"SendGrid error: {str(e)}")
+        # Implement with the async EmailService (aiosmtplib) or SendGrid's REST
+        # API through _get_http_client(); never call a sync SDK from here
         pass
 
     async def _send_sms(self, phone_number: str, message: str) -> None:
-        """Send an SMS notification"""
-        # Implement with Twilio
-        # Example with Twilio:
-        # from twilio.rest import Client
-        #
-        # account_sid = os.environ.get('TWILIO_ACCOUNT_SID')
-        # auth_token = os.environ.get('TWILIO_AUTH_TOKEN')
-        # from_number = os.environ.get('TWILIO_PHONE_NUMBER')
-        #
-        # client = Client(account_sid, auth_token)
-        #
-        # try:
-        #     message = client.messages.create(
-        #         body=message,
-        #         from_=from_number,
-        #         to=phone_number
-        #     )
-        # except Exception as e:
-        #     logger.error(f"Twilio error: {str(e)}")
-        pass
+        """Send an SMS notification through Twilio's REST API"""
+        if not (settings.TWILIO_ACCOUNT_SID and settings.TWILIO_AUTH_TOKEN):
+            return
+
+        response = await _get_http_client().post(
+            f"{TWILIO_API_URL}/Accounts/{settings.TWILIO_ACCOUNT_SID}/Messages.json",
+            data={
+                "To": phone_number,
+                "From": settings.TWILIO_PHONE_NUMBER,
+                "Body": message,
+            },
+            auth=(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN),
+        )
+        response.raise_for_status()
 
     async def _send_push(
         self,
@@ -385,31 +507,9 @@ class NotificationService:
         data: Optional[Dict[str, Any]] = None,
     ) -> None:
         """Send a push notification"""
-        # Implement with Firebase Cloud Messaging
-        # Example with Firebase:
-        # from firebase_admin import messaging
-        #
-        # # Get the user's device tokens from the database
-        # user_tokens = self.db.query(UserDeviceToken).filter(UserDeviceToken.user_id == user_id).all()
-        #
-        # if not user_tokens:
-        #     logger.warning(f"No device tokens found for user {user_id}")
-        #     return
-        #
-        # for token in user_tokens:
-        #     try:
-        #         message = messaging.Message(
-        #             notification=messaging.Notification(
-        #                 title=title,
-        #                 body=message
-        #             ),
-        #             data=data,
-        #             token=token.token
-        #         )
-        #         response = messaging.send(message)
-        #         logger.info(f"Successfully sent message: {response}")
-        #     except Exception as e:
-        #         logger.error(f"Firebase error: {str(e)}")
+        # Implement with Firebase Cloud Messaging's HTTP v1 API through
+        # _get_http_client() once users' device tokens are stored; the
+        # firebase_admin SDK is synchronous and would block the event loop
         pass
 
     @staticmethod
@@ -8,27 +8,338 @@ and set it in the OPENCAGE_API_KEY environment variable.
 """
 
 import asyncio
+import json
 import logging
+import random
+import threading
 import time
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Tuple
+import unicodedata
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+from urllib.parse import quote_plus, urlencode
 
 import httpx
 import requests
+from fastapi.concurrency import run_in_threadpool
+from requests.adapters import HTTPAdapter
+from sqlalchemy import bindparam, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 
+from app.core.cache import TTLCache
 from app.core.config import settings
 from app.models.address import Address
 
+try:
+    import h2  # noqa: F401
+
+    HAS_H2 = True
+except ImportError:
+    HAS_H2 = False
+
+try:
+    import orjson
+
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 logger = logging.getLogger(__name__)
 
 # Default coordinates for Stockholm, Sweden (used when geocoding fails)
 DEFAULT_LAT = 59.3293
 DEFAULT_LON = 18.0686
 
-# Rate limiting for API calls (1 request per second)
+# Rate limiting for API calls (1 request per second on average)
 RATE_LIMIT_SECONDS = 1.0
-last_request_time = 0.0
+
+# Requests allowed back to back before the average rate applies; the free
+# OpenCage plan allows no bursts, paid plans can raise this
+RATE_LIMIT_BURST = 1
+
+# Seconds before a request to the OpenCage API gives up
+REQUEST_TIMEOUT_SECONDS = 10.0
+
+# Attempts per API call; throttled (429) and gateway error responses and
+# network errors are retried with jittered exponential backoff, waiting at
+# least as long as a numeric Retry-After header asks
+REQUEST_ATTEMPTS = 3
+RETRY_BACKOFF_SECONDS = 0.5
+RETRY_BACKOFF_MAX_SECONDS = 4.0
+RETRY_STATUSES = (429, 502, 503, 504)
+
+# After this many failed calls in a row the API is left alone for a while,
+# so an outage does not tie up every request in timeouts and retries
+CIRCUIT_FAIL_MAX = 10
+CIRCUIT_RESET_SECONDS = 60
+
+# Requests a batch keeps in flight at once; the rate limiter decides when
+# they are sent, this only bounds open streams and pending tasks
+BATCH_MAX_CONCURRENCY = 10
+
+# In-process cache in front of the geocoding_cache table, so addresses looked
+# up over and over (a busy pickup point) are answered without a database hit.
+# Both caches are keyed by the normalized address (see _normalize_address)
+MEMORY_CACHE_TTL_SECONDS = 1800
+MEMORY_CACHE_MAX_SIZE = 10000
+
+# Cache hits only record last_used in memory; the timestamps are written to
+# the database in one statement at most this often, so reads stay reads
+LAST_USED_FLUSH_SECONDS = 30
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter shared by sync and async callers.
+
+    Each call reserves a token straight away and is told how long to wait for
+    it, so concurrent callers queue up behind each other instead of all
+    seeing the same "last request" time and firing together.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token and return the seconds to wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= 1
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    async def acquire(self) -> None:
+        """Wait, without blocking the event loop, until a request may be sent"""
+        delay = self._reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+    def acquire_sync(self) -> None:
+        """Block until a request may be sent"""
+        delay = self._reserve()
+        if delay:
+            time.sleep(delay)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the API while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Stops calls to a failing API until a cool-down has passed.
+
+    After the cool-down a single trial call is let through while every other
+    caller is still refused; its failure opens the circuit again, its success
+    closes it. A trial that never reports back is replaced by a new one after
+    another cool-down.
+    """
+
+    def __init__(self, fail_max: int, reset_timeout: float):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def check(self) -> None:
+        """Raise CircuitOpenError if calls are currently blocked"""
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                raise CircuitOpenError("OpenCage API calls paused after failures")
+            # Half-open: restarting the clock keeps other callers out while
+            # this one makes the trial call
+            self.opened_at = time.monotonic()
+            self.trial_in_flight = True
+            self.failures = self.fail_max - 1
+
+    def record(self, success: bool) -> None:
+        with self._lock:
+            if success:
+                self.failures = 0
+                if self.trial_in_flight:
+                    self.opened_at = None
+                    self.trial_in_flight = False
+                return
+            self.trial_in_flight = False
+            self.failures += 1
+            if self.failures >= self.fail_max:
+                self.opened_at = time.monotonic()
+
+
+# Shared by every service instance, like the API quota they protect
+_rate_limiter = TokenBucket(1 / RATE_LIMIT_SECONDS, RATE_LIMIT_BURST)
+_circuit_breaker = CircuitBreaker(CIRCUIT_FAIL_MAX, CIRCUIT_RESET_SECONDS)
+
+
+def _is_failure(status_code: int) -> bool:
+    """Whether a response means the API is struggling, not that we asked badly"""
+    return status_code == 429 or status_code >= 500
+
+
+def _parse_json(content: bytes) -> Any:
+    """Parse an API response body, with orjson when it is installed"""
+    # Both decoders raise a ValueError subclass on malformed input
+    if HAS_ORJSON:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+# Shared by every service instance; most are short-lived, per-request objects
+_memory_cache = TTLCache(MEMORY_CACHE_TTL_SECONDS, MEMORY_CACHE_MAX_SIZE)
+
+
+def _normalize_address(address: str) -> str:
+    """
+    Return the cache key for an address.
+
+    Case, Unicode compatibility forms, surrounding whitespace and spacing
+    around commas are folded, so "Drottninggatan 1, Stockholm" and
+    " drottninggatan 1 ,stockholm" share one cache entry. The original
+    string is still what gets sent to the API.
+    """
+    address = unicodedata.normalize("NFKC", address).lower()
+    parts = (" ".join(part.split()) for part in address.split(","))
+    return ", ".join(part for part in parts if part)
+
+
+# Addresses hit since the last flush of their last_used timestamps
+_pending_last_used: Set[str] = set()
+_last_used_flushed_at = time.monotonic()
+_last_used_lock = threading.Lock()
+
+
+# Cache lookup statements, built on first use (the model cannot be imported
+# at module load) and then reused so every lookup renders identical SQL
+_lookup_statements: Dict[str, Any] = {}
+
+
+def _get_lookup_statements() -> Dict[str, Any]:
+    """Return the parameterized statements used to read the geocoding cache"""
+    if not _lookup_statements:
+        # Import GeocodingCache dynamically to avoid circular imports
+        from app.models.geocoding_cache import GeocodingCache
+
+        _lookup_statements["one"] = select(
+            GeocodingCache.latitude, GeocodingCache.longitude
+        ).where(GeocodingCache.address == bindparam("address"))
+        _lookup_statements["many"] = select(
+            GeocodingCache.address, GeocodingCache.latitude, GeocodingCache.longitude
+        ).where(GeocodingCache.address.in_(bindparam("addresses", expanding=True)))
+    return _lookup_statements
+
+
+# Connections to the API shared by every service instance, so calls reuse open
+# (already TLS-negotiated) connections instead of handshaking each time.
+# Retries are done by _send_sync rather than the adapter, so that every
+# attempt takes its own rate limiter token
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=20))
+
+# Created on first use inside the running event loop
+_async_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    """Return the shared async client used to call the OpenCage API"""
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        if HAS_H2:
+            # Concurrent batch requests become streams on a few long-lived
+            # multiplexed connections instead of opening a socket each; the
+            # server's max_concurrent_streams caps the streams per connection
+            limits = httpx.Limits(
+                max_connections=4, max_keepalive_connections=4, keepalive_expiry=60
+            )
+        else:
+            limits = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+        _async_client = httpx.AsyncClient(
+            http2=HAS_H2, timeout=REQUEST_TIMEOUT_SECONDS, limits=limits
+        )
+    return _async_client
+
+
+def _retry_delay(attempt: int) -> float:
+    """Seconds to wait before retrying after the given failed attempt"""
+    # Full jitter keeps concurrent batch requests from retrying in lockstep
+    backoff = min(RETRY_BACKOFF_MAX_SECONDS, RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+    return random.uniform(0, backoff)
+
+
+def _retry_after_seconds(headers: Mapping[str, str]) -> float:
+    """Return the numeric Retry-After delay of a response, or 0 without one"""
+    try:
+        return max(0.0, float(headers.get("Retry-After")))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _send_sync(url: str, params: Optional[Dict[str, Any]] = None) -> requests.Response:
+    """Send a rate-limited GET to the API, retrying transient failures"""
+    _circuit_breaker.check()
+    for attempt in range(1, REQUEST_ATTEMPTS + 1):
+        # Every attempt, retries included, counts against the API quota
+        _rate_limiter.acquire_sync()
+        delay = _retry_delay(attempt)
+        try:
+            response = _session.get(url, params=params, timeout=REQUEST_TIMEOUT_SECONDS)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == REQUEST_ATTEMPTS:
+                _circuit_breaker.record(success=False)
+                raise
+        else:
+            if (
+                response.status_code not in RETRY_STATUSES
+                or attempt == REQUEST_ATTEMPTS
+            ):
+                _circuit_breaker.record(success=not _is_failure(response.status_code))
+                return response
+            delay = max(delay, _retry_after_seconds(response.headers))
+
+        time.sleep(delay)
+
+
+async def _send(url: str, params: Optional[Dict[str, Any]] = None) -> httpx.Response:
+    """Send a rate-limited GET to the API, retrying transient failures"""
+    _circuit_breaker.check()
+    for attempt in range(1, REQUEST_ATTEMPTS + 1):
+        await _rate_limiter.acquire()
+        delay = _retry_delay(attempt)
+        try:
+            response = await _get_async_client().get(url, params=params)
+        except httpx.TransportError:
+            if attempt == REQUEST_ATTEMPTS:
+                _circuit_breaker.record(success=False)
+                raise
+        else:
+            if (
+                response.status_code not in RETRY_STATUSES
+                or attempt == REQUEST_ATTEMPTS
+            ):
+                _circuit_breaker.record(success=not _is_failure(response.status_code))
+                return response
+            delay = max(delay, _retry_after_seconds(response.headers))
+
+        await asyncio.sleep(delay)
+
+
+async def close_async_client() -> None:
+    """Close the shared async client; called on application shutdown"""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
 
 
 class OpenCageGeocodingService:
@@ -42,7 +353,8 @@ class OpenCageGeocodingService:
         Initialize the geocoding service.
 
         Args:
-            db: SQLAlchemy database session for caching
+            db: SQLAlchemy database session for caching (a pooled session is
+                used per cache operation when omitted)
             api_key: OpenCage API key (defaults to settings.OPENCAGE_API_KEY)
         """
         self.db = db
@@ -50,6 +362,40 @@ class OpenCageGeocodingService:
         self.cache_ttl = timedelta(days=30)  # Cache coordinates for 30 days
         self.base_url = "https://api.opencagedata.com/geocode/v1/json"
 
+        # Forward lookups only vary by address, so the rest of the query
+        # string is encoded once here rather than on every request
+        forward_params = {
+            "key": self.api_key,
+            "limit": 1,
+            "no_annotations": 1,
+            "no_record": 1,
+            "pretty": 0,
+            # Only the geometry is read, so the formatted string may be short
+            "abbrv": 1,
+        }
+        self._forward_url_prefix = f"{self.base_url}?{urlencode(forward_params)}&q="
+
+    def _cache_session(self) -> Session:
+        """
+        Return the session to run cache queries on.
+
+        Services created without a session, like the module-level singleton,
+        borrow one from the connection pool per cache operation instead of
+        skipping the database cache; callers close it with _release_session.
+        """
+        if self.db is not None:
+            return self.db
+
+        # Import SessionLocal dynamically to avoid circular imports
+        from app.db.session import SessionLocal
+
+        return SessionLocal()
+
+    def _release_session(self, db: Session) -> None:
+        """Close a session returned by _cache_session unless the caller owns it"""
+        if db is not self.db:
+            db.close()
+
     def _get_from_cache(self, address: str) -> Optional[Tuple[float, float]]:
         """
         Get coordinates from cache if available and not expired.
@@ -60,32 +406,113 @@ class OpenCageGeocodingService:
         Returns:
             Tuple of (latitude, longitude) or None if not in cache
         """
-        if not self.db:
-            return None
+        key = _normalize_address(address)
+        cached = _memory_cache.get(key)
+        if cached:
+            return cached
 
+        db = self._cache_session()
         try:
-            # Import GeocodingCache dynamically to avoid circular imports
-            from app.models.geocoding_cache import GeocodingCache
-
-            # Look up in cache
-            cache_entry = (
-                self.db.query(GeocodingCache)
-                .filter(GeocodingCache.address == address)
-                .first()
-            )
+            # Look up in cache; only the coordinates are needed, so skip
+            # building an ORM object (address has a unique index)
+            row = db.execute(_get_lookup_statements()["one"], {"address": key}).first()
 
-            if not cache_entry:
+            if not row:
                 return None
 
-            # Update last_used timestamp
-            cache_entry.last_used = datetime.now(datetime.timezone.utc)
-            self.db.commit()
+            self._touch_last_used(db, [key])
 
-            return (cache_entry.latitude, cache_entry.longitude)
+            coordinates = (row.latitude, row.longitude)
+            _memory_cache.set(key, coordinates)
+            return coordinates
 
         except Exception as e:
-            logger.error(f"Error retrieving from geocoding cache: {str(e)}")
+            logger.error("Error retrieving from geocoding cache: %s", e)
             return None
+        finally:
+            self._release_session(db)
+
+    def _get_many_from_cache(
+        self, addresses: List[str]
+    ) -> Dict[str, Tuple[float, float]]:
+        """
+        Get cached coordinates for several addresses with one lookup.
+
+        Args:
+            addresses: Address strings to look up
+
+        Returns:
+            Dictionary mapping each cached address to (latitude, longitude)
+        """
+        keys = {address: _normalize_address(address) for address in addresses}
+        cached = {}
+        for address, key in keys.items():
+            coordinates = _memory_cache.get(key)
+            if coordinates:
+                cached[address] = coordinates
+        missing = {key for address, key in keys.items() if address not in cached}
+
+        if not missing:
+            return cached
+
+        db = self._cache_session()
+        try:
+            rows = db.execute(
+                _get_lookup_statements()["many"], {"addresses": list(missing)}
+            ).all()
+            if not rows:
+                return cached
+
+            found = {row.address: (row.latitude, row.longitude) for row in rows}
+            for key, coordinates in found.items():
+                _memory_cache.set(key, coordinates)
+            for address, key in keys.items():
+                if key in found:
+                    cached[address] = found[key]
+
+            self._touch_last_used(db, found)
+
+            return cached
+
+        except Exception as e:
+            logger.error("Error retrieving from geocoding cache: %s", e)
+            db.rollback()
+            return cached
+        finally:
+            self._release_session(db)
+
+    def _touch_last_used(self, db: Session, addresses: Iterable[str]) -> None:
+        """
+        Record cache hits and flush their last_used timestamps when due.
+
+        Args:
+            db: Session the hits were read with
+            addresses: Addresses that were just read from the cache
+        """
+        global _last_used_flushed_at
+
+        with _last_used_lock:
+            _pending_last_used.update(addresses)
+            if time.monotonic() - _last_used_flushed_at < LAST_USED_FLUSH_SECONDS:
+                return
+            pending = list(_pending_last_used)
+            _pending_last_used.clear()
+            _last_used_flushed_at = time.monotonic()
+
+        try:
+            # Import GeocodingCache dynamically to avoid circular imports
+            from app.models.geocoding_cache import GeocodingCache
+
+            db.query(GeocodingCache).filter(GeocodingCache.address.in_(pending)).update(
+                {GeocodingCache.last_used: datetime.now(timezone.utc)},
+                synchronize_session=False,
+            )
+            db.commit()
+
+        except Exception as e:
+            # Only bookkeeping is lost; the cached coordinates are unaffected
+            logger.error("Error updating geocoding cache last_used: %s", e)
+            db.rollback()
 
     def _save_to_cache(self, address: str, coordinates: Tuple[float, float]) -> bool:
         """
@@ -98,43 +525,74 @@ class OpenCageGeocodingService:
         Returns:
             True if saved successfully, False otherwise
         """
-        if not self.db:
+        # A one-row upsert: one statement, no SELECT or ORM object to update
+        return self._save_many_to_cache({address: coordinates})
+
+    def _save_many_to_cache(self, entries: Dict[str, Tuple[float, float]]) -> bool:
+        """
+        Save coordinates for several addresses with a single upsert.
+
+        Args:
+            entries: Dictionary mapping address strings to (latitude, longitude)
+
+        Returns:
+            True if saved successfully, False otherwise
+        """
+        # Spellings of one address collapse to a single row, which the
+        # upsert needs: a statement may not touch the same key twice
+        entries = {
+            _normalize_address(address): coordinates
+            for address, coordinates in entries.items()
+        }
+        for address, coordinates in entries.items():
+            _memory_cache.set(address, coordinates)
+
+        if not entries:
             return False
 
+        db = self._cache_session()
         try:
             # Import GeocodingCache dynamically to avoid circular imports
             from app.models.geocoding_cache import GeocodingCache
 
-            # Check if entry already exists
-            existing = (
-                self.db.query(GeocodingCache)
-                .filter(GeocodingCache.address == address)
-                .first()
-            )
-
-            if existing:
-                # Update existing entry
-                existing.latitude = coordinates[0]
-                existing.longitude = coordinates[1]
-                existing.coordinates = f"{coordinates[0]},{coordinates[1]}"
-                existing.last_used = datetime.now(datetime.timezone.utc)
+            if db.get_bind().dialect.name == "postgresql":
+                insert = postgresql_insert
             else:
-                # Create new entry
-                cache_entry = GeocodingCache(
-                    address=address,
-                    latitude=coordinates[0],
-                    longitude=coordinates[1],
-                    coordinates=f"{coordinates[0]},{coordinates[1]}",
-                )
-                self.db.add(cache_entry)
-
-            self.db.commit()
+                insert = sqlite_insert
+
+            now = datetime.now(timezone.utc)
+            stmt = insert(GeocodingCache).values(
+                [
+                    {
+                        "address": address,
+                        "latitude": latitude,
+                        "longitude": longitude,
+                        "coordinates": f"{latitude},{longitude}",
+                        "created_at": now,
+                        "last_used": now,
+                    }
+                    for address, (latitude, longitude) in entries.items()
+                ]
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[GeocodingCache.address],
+                set_={
+                    "latitude": stmt.excluded.latitude,
+                    "longitude": stmt.excluded.longitude,
+                    "coordinates": stmt.excluded.coordinates,
+                    "last_used": stmt.excluded.last_used,
+                },
+            )
+            db.execute(stmt)
+            db.commit()
             return True
 
         except Exception as e:
-            logger.error(f"Error saving to geocoding cache: {str(e)}")
-            self.db.rollback()
+            logger.error("Error saving to geocoding cache: %s", e)
+            db.rollback()
             return False
+        finally:
+            self._release_session(db)
 
     def geocode_address(self, address: Address) -> bool:
         """
@@ -153,31 +611,25 @@ class OpenCageGeocodingService:
         address_string = address.get_geocoding_string()
 
         # Check cache first
-        if self.db:
-            cached_coords = self._get_from_cache(address_string)
-            if cached_coords:
-                logger.info(f"Retrieved coordinates for '{address_string}' from cache")
-                latitude, longitude = cached_coords
-                address.latitude = latitude
-                address.longitude = longitude
-                return True
+        cached_coords = self._get_from_cache(address_string)
+        if cached_coords:
+            logger.debug("Retrieved coordinates for '%s' from cache", address_string)
+            latitude, longitude = cached_coords
+            address.latitude = latitude
+            address.longitude = longitude
+            return True
 
-        # If not in cache, get from API
-        coordinates = self.get_coordinates(address_string)
+        # If not in cache, get from API (which also saves to cache)
+        coordinates = self._geocode_uncached(address_string)
 
         if coordinates:
             # Update the address object with coordinates
             latitude, longitude = coordinates
             address.latitude = latitude
             address.longitude = longitude
-
-            # Save to cache
-            if self.db:
-                self._save_to_cache(address_string, coordinates)
-
             return True
         else:
-            logger.warning(f"Geocoding failed for address: {address_string}")
+            logger.warning("Geocoding failed for address: %s", address_string)
             return False
 
     def get_coordinates(self, address: str) -> Optional[Tuple[float, float]]:
@@ -190,65 +642,65 @@ class OpenCageGeocodingService:
         Returns:
             Tuple of (latitude, longitude) or None if geocoding fails
         """
-        global last_request_time
-
         if not address or address.strip() == "":
             logger.warning("Empty address provided for geocoding")
             return None
 
+        # Check cache first
+        cached_coords = self._get_from_cache(address)
+        if cached_coords:
+            logger.debug("Retrieved coordinates for '%s' from cache", address)
+            return cached_coords
+
+        return self._geocode_uncached(address)
+
+    def _geocode_uncached(self, address: str) -> Optional[Tuple[float, float]]:
+        """
+        Get coordinates for an address string from the API and cache them.
+
+        Callers check the cache themselves first.
+
+        Args:
+            address: String address to geocode
+
+        Returns:
+            Tuple of (latitude, longitude) or None if geocoding fails
+        """
         if not self.api_key:
             logger.error("OpenCage API key is not set")
             return None
 
-        logger.info(f"Attempting to geocode address: {address}")
+        logger.info("Attempting to geocode address: %s", address)
 
         try:
-            # Check cache first
-            if self.db:
-                cached_coords = self._get_from_cache(address)
-                if cached_coords:
-                    logger.info(f"Retrieved coordinates for '{address}' from cache")
-                    return cached_coords
-
-            # Respect rate limits
-            current_time = time.time()
-            time_since_last_request = current_time - last_request_time
-            if time_since_last_request < RATE_LIMIT_SECONDS:
-                time.sleep(RATE_LIMIT_SECONDS - time_since_last_request)
-
-            # Prepare request parameters
-            params = {
-                "key": self.api_key,
-                "q": address,
-                "limit": 1,
-                "no_annotations": 1,
-            }
+            url = self._forward_url_prefix + quote_plus(address)
 
             # Make the API request
             try:
-                response = requests.get(self.base_url, params=params, timeout=10.0)
-                last_request_time = time.time()
+                response = _send_sync(url)
 
                 # Check for HTTP errors
                 if response.status_code != 200:
                     logger.error(
-                        f"Geocoding API returned status code {response.status_code}: {response.text}"
+                        "Geocoding API returned status code %s: %s",
+                        response.status_code,
+                        response.text,
                     )
                     return None
 
                 # Parse the response
                 try:
-                    data = response.json()
+                    data = _parse_json(response.content)
                 except ValueError as e:
-                    logger.error(f"Error parsing JSON response: {str(e)}")
+                    logger.error("Error parsing JSON response: %s", e)
                     return None
             except requests.RequestException as e:
-                logger.error(f"Request error during geocoding: {str(e)}")
+                logger.error("Request error during geocoding: %s", e)
                 return None
 
             # Check if we got any results
             if data.get("total_results", 0) == 0 or not data.get("results"):
-                logger.warning(f"No geocoding results for: {address}")
+                logger.warning("No geocoding results for: %s", address)
                 return None
 
             # Extract coordinates from the first result
@@ -256,7 +708,7 @@ class OpenCageGeocodingService:
             geometry = result.get("geometry")
 
             if not geometry:
-                logger.warning(f"No geometry in response for address: {address}")
+                logger.warning("No geometry in response for address: %s", address)
                 return None
 
             latitude = geometry.get("lat")
@@ -264,97 +716,106 @@ class OpenCageGeocodingService:
 
             if latitude is None or longitude is None:
                 logger.warning(
-                    f"Invalid coordinates in response for address: {address}"
+                    "Invalid coordinates in response for address: %s", address
                 )
                 return None
 
-            logger.info(f"Successfully geocoded {address} to: {latitude}, {longitude}")
+            logger.info(
+                "Successfully geocoded %s to: %s, %s", address, latitude, longitude
+            )
 
             # Save to cache
-            if self.db:
-                self._save_to_cache(address, (latitude, longitude))
+            self._save_to_cache(address, (latitude, longitude))
 
             return (latitude, longitude)
 
         except Exception as e:
-            logger.error(f"Error geocoding address '{address}': {str(e)}")
+            logger.error("Error geocoding address '%s': %s", address, e)
             return None
 
     async def get_coordinates_async(
-        self, address: str
+        self, address: str, use_cache: bool = True
     ) -> Optional[Tuple[float, float]]:
         """
         Get coordinates for an address string (asynchronous version).
 
         Args:
             address: String address to geocode
+            use_cache: Whether to read and write the cache; batch callers that
+                handle the cache themselves pass False
 
         Returns:
             Tuple of (latitude, longitude) or None if geocoding fails
         """
-        global last_request_time
-
         if not address or address.strip() == "":
             logger.warning("Empty address provided for geocoding")
             return None
 
+        # Check cache first; memory hits are answered on the event loop, the
+        # database lookup runs in a worker thread so it cannot stall it
+        if use_cache:
+            cached_coords = _memory_cache.get(
+                _normalize_address(address)
+            ) or await run_in_threadpool(self._get_from_cache, address)
+            if cached_coords:
+                logger.debug("Retrieved coordinates for '%s' from cache", address)
+                return cached_coords
+
+        return await self._geocode_uncached_async(address, save_to_cache=use_cache)
+
+    async def _geocode_uncached_async(
+        self, address: str, save_to_cache: bool = True
+    ) -> Optional[Tuple[float, float]]:
+        """
+        Get coordinates for an address string from the API (asynchronous version).
+
+        Callers check the cache themselves first.
+
+        Args:
+            address: String address to geocode
+            save_to_cache: Whether to cache the result
+
+        Returns:
+            Tuple of (latitude, longitude) or None if geocoding fails
+        """
         if not self.api_key:
             logger.error("OpenCage API key is not set")
             return None
 
-        logger.info(f"Attempting to geocode address: {address}")
+        logger.info("Attempting to geocode address: %s", address)
 
         try:
-            # Check cache first
-            if self.db:
-                cached_coords = self._get_from_cache(address)
-                if cached_coords:
-                    logger.info(f"Retrieved coordinates for '{address}' from cache")
-                    return cached_coords
-
-            # Respect rate limits
-            current_time = time.time()
-            time_since_last_request = current_time - last_request_time
-            if time_since_last_request < RATE_LIMIT_SECONDS:
-                await asyncio.sleep(RATE_LIMIT_SECONDS - time_since_last_request)
-
-            # Prepare request parameters
-            params = {
-                "key": self.api_key,
-                "q": address,
-                "limit": 1,
-                "no_annotations": 1,
-            }
+            url = self._forward_url_prefix + quote_plus(address)
 
             # Make the API request
             try:
-                async with httpx.AsyncClient(timeout=10.0) as client:
-                    response = await client.get(self.base_url, params=params)
-                    last_request_time = time.time()
-
-                    # Check for HTTP errors
-                    if response.status_code != 200:
-                        logger.error(
-                            f"Geocoding API returned status code {response.status_code}: {response.text}"
-                        )
-                        return None
-
-                    # Parse the response
-                    try:
-                        data = response.json()
-                    except ValueError as e:
-                        logger.error(f"Error parsing JSON response: {str(e)}")
-                        return None
+                response = await _send(url)
+
+                # Check for HTTP errors
+                if response.status_code != 200:
+                    logger.error(
+                        "Geocoding API returned status code %s: %s",
+                        response.status_code,
+                        response.text,
+                    )
+                    return None
+
+                # Parse the response
+                try:
+                    data = _parse_json(response.content)
+                except ValueError as e:
+                    logger.error("Error parsing JSON response: %s", e)
+                    return None
             except httpx.HTTPError as e:
-                logger.error(f"HTTP error during geocoding: {str(e)}")
+                logger.error("HTTP error during geocoding: %s", e)
                 return None
             except Exception as e:
-                logger.error(f"Request error during geocoding: {str(e)}")
+                logger.error("Request error during geocoding: %s", e)
                 return None
 
             # Check if we got any results
             if data.get("total_results", 0) == 0 or not data.get("results"):
-                logger.warning(f"No geocoding results for: {address}")
+                logger.warning("No geocoding results for: %s", address)
                 return None
 
             # Extract coordinates from the first result
@@ -362,7 +823,7 @@ class OpenCageGeocodingService:
             geometry = result.get("geometry")
 
             if not geometry:
-                logger.warning(f"No geometry in response for address: {address}")
+                logger.warning("No geometry in response for address: %s", address)
                 return None
 
             latitude = geometry.get("lat")
@@ -370,20 +831,24 @@ class OpenCageGeocodingService:
 
             if latitude is None or longitude is None:
                 logger.warning(
-                    f"Invalid coordinates in response for address: {address}"
+                    "Invalid coordinates in response for address: %s", address
                 )
                 return None
 
-            logger.info(f"Successfully geocoded {address} to: {latitude}, {longitude}")
+            logger.info(
+                "Successfully geocoded %s to: %s, %s", address, latitude, longitude
+            )
 
             # Save to cache
-            if self.db:
-                self._save_to_cache(address, (latitude, longitude))
+            if save_to_cache:
+                await run_in_threadpool(
+                    self._save_to_cache, address, (latitude, longitude)
+                )
 
             return (latitude, longitude)
 
         except Exception as e:
-            logger.error(f"Error geocoding address '{address}': {str(e)}")
+            logger.error("Error geocoding address '%s': %s", address, e)
             return None
 
     async def batch_geocode(
@@ -405,46 +870,52 @@ class OpenCageGeocodingService:
             logger.error("OpenCage API key is not set")
             return {addr: None for addr in addresses}
 
-        # Check cache first for all addresses
-        results = {}
-        addresses_to_geocode = []
-
-        if self.db:
-            for address in addresses:
-                cached_coords = self._get_from_cache(address)
-                if cached_coords:
-                    results[address] = cached_coords
-                else:
-                    addresses_to_geocode.append(address)
-        else:
-            addresses_to_geocode = addresses
+        # Check cache first for all addresses in one lookup
+        results = await run_in_threadpool(self._get_many_from_cache, addresses)
+
+        # Send one request per distinct normalized address
+        pending: Dict[str, str] = {}
+        for address in addresses:
+            if address not in results:
+                pending.setdefault(_normalize_address(address), address)
+        addresses_to_geocode = list(pending.values())
 
         # If all addresses were in cache, return early
         if not addresses_to_geocode:
             return results
 
-        # Geocode remaining addresses with rate limiting
-        tasks = []
-        for address in addresses_to_geocode:
-            # Add a small delay between requests to respect rate limits
-            if tasks:  # Add delay after the first request
-                await asyncio.sleep(RATE_LIMIT_SECONDS)
-            tasks.append(self.get_coordinates_async(address))
+        # Geocode remaining addresses concurrently; each request waits for
+        # its turn from the shared rate limiter
+        semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+
+        async def geocode_one(address: str) -> Optional[Tuple[float, float]]:
+            async with semaphore:
+                return await self.get_coordinates_async(address, use_cache=False)
+
+        tasks = [geocode_one(address) for address in addresses_to_geocode]
 
         # Wait for all geocoding tasks to complete
         coords_list = await asyncio.gather(*tasks, return_exceptions=True)
 
         # Process results
+        geocoded = {}
         for i, coords in enumerate(coords_list):
             address = addresses_to_geocode[i]
             if isinstance(coords, Exception):
-                logger.error(f"Error geocoding address '{address}': {str(coords)}")
+                logger.error("Error geocoding address '%s': %s", address, coords)
                 results[address] = None
             else:
                 results[address] = coords
-                # Save to cache if available
-                if self.db and coords:
-                    self._save_to_cache(address, coords)
+                if coords:
+                    geocoded[address] = coords
+
+        # Other spellings of a geocoded address share its result
+        for address in addresses:
+            if address not in results:
+                results[address] = results[pending[_normalize_address(address)]]
+
+        # Save all new coordinates to cache at once
+        await run_in_threadpool(self._save_many_to_cache, geocoded)
 
         return results
 
@@ -461,8 +932,6 @@ class OpenCageGeocodingService:
         Returns:
             Dictionary with address components or None if reverse geocoding fails
         """
-        global last_request_time
-
         if latitude is None or longitude is None:
             logger.warning("Null coordinates provided for reverse geocoding")
             return None
@@ -472,37 +941,32 @@ class OpenCageGeocodingService:
             return None
 
         logger.info(
-            f"Attempting to reverse geocode coordinates: {latitude}, {longitude}"
+            "Attempting to reverse geocode coordinates: %s, %s", latitude, longitude
         )
 
         try:
-            # Respect rate limits
-            current_time = time.time()
-            time_since_last_request = current_time - last_request_time
-            if time_since_last_request < RATE_LIMIT_SECONDS:
-                time.sleep(RATE_LIMIT_SECONDS - time_since_last_request)
-
             # Prepare request parameters
             params = {
                 "key": self.api_key,
                 "q": f"{latitude},{longitude}",
                 "limit": 1,
                 "no_annotations": 1,
+                "no_record": 1,
+                "pretty": 0,
             }
 
             # Make the API request
-            response = requests.get(self.base_url, params=params, timeout=10.0)
-            last_request_time = time.time()
+            response = _send_sync(self.base_url, params=params)
 
             response.raise_for_status()
 
             # Parse the response
-            data = response.json()
+            data = _parse_json(response.content)
 
             # Check if we got any results
             if data.get("total_results", 0) == 0 or not data.get("results"):
                 logger.warning(
-                    f"No reverse geocoding results for: {latitude}, {longitude}"
+                    "No reverse geocoding results for: %s, %s", latitude, longitude
                 )
                 return None
 
@@ -524,12 +988,15 @@ class OpenCageGeocodingService:
                 "formatted_address": formatted,
             }
 
-            logger.info(f"Successfully reverse geocoded to: {formatted}")
+            logger.info("Successfully reverse geocoded to: %s", formatted)
             return address_components
 
         except Exception as e:
             logger.error(
-                f"Error reverse geocoding coordinates '{latitude}, {longitude}': {str(e)}"
+                "Error reverse geocoding coordinates '%s, %s': %s",
+                latitude,
+                longitude,
+                e,
             )
             return None
 
@@ -546,8 +1013,6 @@ class OpenCageGeocodingService:
         Returns:
             Dictionary with address components or None if reverse geocoding fails
         """
-        global last_request_time
-
         if latitude is None or longitude is None:
             logger.warning("Null coordinates provided for reverse geocoding")
             return None
@@ -557,69 +1022,67 @@ class OpenCageGeocodingService:
             return None
 
         logger.info(
-            f"Attempting to reverse geocode coordinates: {latitude}, {longitude}"
+            "Attempting to reverse geocode coordinates: %s, %s", latitude, longitude
         )
 
         try:
-            # Respect rate limits
-            current_time = time.time()
-            time_since_last_request = current_time - last_request_time
-            if time_since_last_request < RATE_LIMIT_SECONDS:
-                await asyncio.sleep(RATE_LIMIT_SECONDS - time_since_last_request)
-
             # Prepare request parameters
             params = {
                 "key": self.api_key,
                 "q": f"{latitude},{longitude}",
                 "limit": 1,
                 "no_annotations": 1,
+                "no_record": 1,
+                "pretty": 0,
             }
 
             # Make the API request
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(self.base_url, params=params)
-                last_request_time = time.time()
+            response = await _send(self.base_url, params=params)
 
-                if response.status_code != 200:
-                    logger.error(
-                        f"Reverse geocoding API returned status code {response.status_code}"
-                    )
-                    return None
+            if response.status_code != 200:
+                logger.error(
+                    "Reverse geocoding API returned status code %s",
+                    response.status_code,
+                )
+                return None
 
-                # Parse the response
-                data = response.json()
+            # Parse the response
+            data = _parse_json(response.content)
 
-                # Check if we got any results
-                if data.get("total_results", 0) == 0 or not data.get("results"):
-                    logger.warning(
-                        f"No reverse geocoding results for: {latitude}, {longitude}"
-                    )
-                    return None
+            # Check if we got any results
+            if data.get("total_results", 0) == 0 or not data.get("results"):
+                logger.warning(
+                    "No reverse geocoding results for: %s, %s", latitude, longitude
+                )
+                return None
 
-                # Extract address from the first result
-                result = data["results"][0]
-                components = result.get("components", {})
-                formatted = result.get("formatted", "")
-
-                # Format the address components
-                address_components = {
-                    "road": components.get("road"),
-                    "house_number": components.get("house_number"),
-                    "postcode": components.get("postcode"),
-                    "city": components.get("city")
-                    or components.get("town")
-                    or components.get("village"),
-                    "state": components.get("state"),
-                    "country": components.get("country"),
-                    "formatted_address": formatted,
-                }
-
-                logger.info(f"Successfully reverse geocoded to: {formatted}")
-                return address_components
+            # Extract address from the first result
+            result = data["results"][0]
+            components = result.get("components", {})
+            formatted = result.get("formatted", "")
+
+            # Format the address components
+            address_components = {
+                "road": components.get("road"),
+                "house_number": components.get("house_number"),
+                "postcode": components.get("postcode"),
+                "city": components.get("city")
+                or components.get("town")
+                or components.get("village"),
+                "state": components.get("state"),
+                "country": components.get("country"),
+                "formatted_address": formatted,
+            }
+
+            logger.info("Successfully reverse geocoded to: %s", formatted)
+            return address_components
 
         except Exception as e:
             logger.error(
-                f"Error reverse geocoding coordinates '{latitude}, {longitude}': {str(e)}"
+                "Error reverse geocoding coordinates '%s, %s': %s",
+                latitude,
+                longitude,
+                e,
             )
             return None
 
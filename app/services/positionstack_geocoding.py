@@ -1,7 +1,7 @@
 """
 Geocoding service using the Positionstack API.
-This service provides both synchronous and asynchronous methods for geocoding addresses
-and reverse geocoding coordinates.
+This service provides asynchronous methods for geocoding addresses and reverse
+geocoding coordinates, so lookups never block the event loop.
 
 To use this service, you need to get a free API key from https://positionstack.com/
 and set it in the POSITIONSTACK_API_KEY environment variable.
@@ -14,7 +14,6 @@ from datetime import datetime, timedelta
 from typing import Any, Dict, Optional, Tuple
 
 import httpx
-import requests
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
@@ -23,6 +22,13 @@ from app.models.address import Address
 # Import GeocodingCache model dynamically to avoid circular imports
 # from app.models.geocoding_cache import GeocodingCache
 
+try:
+    import h2  # noqa: F401
+
+    HAS_H2 = True
+except ImportError:
+    HAS_H2 = False
+
 logger = logging.getLogger(__name__)
 
 # Default coordinates for Stockholm, Sweden (used when geocoding fails)
@@ -33,6 +39,34 @@ DEFAULT_LON = 18.0686
 RATE_LIMIT_SECONDS = 1.0
 last_request_time = 0.0
 
+# Seconds before a request to the Positionstack API gives up
+REQUEST_TIMEOUT_SECONDS = 10.0
+
+# Created on first use inside the running event loop and shared by every
+# service instance, so lookups reuse open connections instead of paying for
+# DNS, TCP and TLS setup each time
+_async_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    """Return the shared async client used to call the Positionstack API"""
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            http2=HAS_H2,
+            timeout=REQUEST_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+        )
+    return _async_client
+
+
+async def close_async_client() -> None:
+    """Close the shared async client; called on application shutdown"""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
 
 class PositionstackGeocodingService:
     """
@@ -139,7 +173,7 @@ class PositionstackGeocodingService:
             self.db.rollback()
             return False
 
-    def geocode_address(self, address: Address) -> bool:
+    async def geocode_address(self, address: Address) -> bool:
         """
         Geocode an address object and update its coordinates.
 
@@ -166,7 +200,7 @@ class PositionstackGeocodingService:
                 return True
 
         # If not in cache, get from API
-        coordinates = self.get_coordinates(address_string)
+        coordinates = await self.get_coordinates_async(address_string)
 
         if coordinates:
             # Update the address object with coordinates
@@ -183,9 +217,11 @@ class PositionstackGeocodingService:
             logger.warning(f"Geocoding failed for address: {address_string}")
             return False
 
-    def get_coordinates(self, address: str) -> Optional[Tuple[float, float]]:
+    async def get_coordinates_async(
+        self, address: str
+    ) -> Optional[Tuple[float, float]]:
         """
-        Get coordinates for an address string (synchronous version).
+        Get coordinates for an address string (asynchronous version).
 
         Args:
             address: String address to geocode
@@ -210,7 +246,7 @@ class PositionstackGeocodingService:
             current_time = time.time()
             time_since_last_request = current_time - last_request_time
             if time_since_last_request < RATE_LIMIT_SECONDS:
-                time.sleep(RATE_LIMIT_SECONDS - time_since_last_request)
+                await asyncio.sleep(RATE_LIMIT_SECONDS - time_since_last_request)
 
             # Prepare request parameters
             params = {
@@ -221,12 +257,16 @@ class PositionstackGeocodingService:
             }
 
             # Make the API request
-            response = requests.get(
-                f"{self.base_url}/forward", params=params, timeout=10.0
+            response = await _get_async_client().get(
+                f"{self.base_url}/forward", params=params
             )
             last_request_time = time.time()
 
-            response.raise_for_status()
+            if response.status_code != 200:
+                logger.error(
+                    f"Geocoding API returned status code {response.status_code}"
+                )
+                return None
 
             # Parse the response
             data = response.json()
@@ -254,89 +294,11 @@ class PositionstackGeocodingService:
             logger.error(f"Error geocoding address '{address}': {str(e)}")
             return None
 
-    async def get_coordinates_async(
-        self, address: str
-    ) -> Optional[Tuple[float, float]]:
-        """
-        Get coordinates for an address string (asynchronous version).
-
-        Args:
-            address: String address to geocode
-
-        Returns:
-            Tuple of (latitude, longitude) or None if geocoding fails
-        """
-        global last_request_time
-
-        if not address or address.strip() == "":
-            logger.warning("Empty address provided for geocoding")
-            return None
-
-        if not self.api_key:
-            logger.error("Positionstack API key is not set")
-            return None
-
-        logger.info(f"Attempting to geocode address: {address}")
-
-        try:
-            # Respect rate limits
-            current_time = time.time()
-            time_since_last_request = current_time - last_request_time
-            if time_since_last_request < RATE_LIMIT_SECONDS:
-                await asyncio.sleep(RATE_LIMIT_SECONDS - time_since_last_request)
-
-            # Prepare request parameters
-            params = {
-                "access_key": self.api_key,
-                "query": address,
-                "limit": 1,
-                "output": "json",
-            }
-
-            # Make the API request
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(f"{self.base_url}/forward", params=params)
-                last_request_time = time.time()
-
-                if response.status_code != 200:
-                    logger.error(
-                        f"Geocoding API returned status code {response.status_code}"
-                    )
-                    return None
-
-                # Parse the response
-                data = response.json()
-
-                # Check if we got any results
-                if not data.get("data") or len(data["data"]) == 0:
-                    logger.warning(f"No geocoding results for: {address}")
-                    return None
-
-                # Extract coordinates from the first result
-                result = data["data"][0]
-                latitude = result.get("latitude")
-                longitude = result.get("longitude")
-
-                if latitude is None or longitude is None:
-                    logger.warning(
-                        f"Invalid coordinates in response for address: {address}"
-                    )
-                    return None
-
-                logger.info(
-                    f"Successfully geocoded {address} to: {latitude}, {longitude}"
-                )
-                return (latitude, longitude)
-
-        except Exception as e:
-            logger.error(f"Error geocoding address '{address}': {str(e)}")
-            return None
-
-    def reverse_geocode(
+    async def reverse_geocode_async(
         self, latitude: float, longitude: float
     ) -> Optional[Dict[str, Any]]:
         """
-        Convert coordinates to address (synchronous version).
+        Convert coordinates to address (asynchronous version).
 
         Args:
             latitude: Latitude coordinate
@@ -364,7 +326,7 @@ class PositionstackGeocodingService:
             current_time = time.time()
             time_since_last_request = current_time - last_request_time
             if time_since_last_request < RATE_LIMIT_SECONDS:
-                time.sleep(RATE_LIMIT_SECONDS - time_since_last_request)
+                await asyncio.sleep(RATE_LIMIT_SECONDS - time_since_last_request)
 
             # Prepare request parameters
             params = {
@@ -375,12 +337,16 @@ class PositionstackGeocodingService:
             }
 
             # Make the API request
-            response = requests.get(
-                f"{self.base_url}/reverse", params=params, timeout=10.0
+            response = await _get_async_client().get(
+                f"{self.base_url}/reverse", params=params
             )
             last_request_time = time.time()
 
-            response.raise_for_status()
+            if response.status_code != 200:
+                logger.error(
+                    f"Reverse geocoding API returned status code {response.status_code}"
+                )
+                return None
 
             # Parse the response
             data = response.json()
@@ -418,95 +384,6 @@ class PositionstackGeocodingService:
             )
             return None
 
-    async def reverse_geocode_async(
-        self, latitude: float, longitude: float
-    ) -> Optional[Dict[str, Any]]:
-        """
-        Convert coordinates to address (asynchronous version).
-
-        Args:
-            latitude: Latitude coordinate
-            longitude: Longitude coordinate
-
-        Returns:
-            Dictionary with address components or None if reverse geocoding fails
-        """
-        global last_request_time
-
-        if latitude is None or longitude is None:
-            logger.warning("Null coordinates provided for reverse geocoding")
-            return None
-
-        if not self.api_key:
-            logger.error("Positionstack API key is not set")
-            return None
-
-        logger.info(
-            f"Attempting to reverse geocode coordinates: {latitude}, {longitude}"
-        )
-
-        try:
-            # Respect rate limits
-            current_time = time.time()
-            time_since_last_request = current_time - last_request_time
-            if time_since_last_request < RATE_LIMIT_SECONDS:
-                await asyncio.sleep(RATE_LIMIT_SECONDS - time_since_last_request)
-
-            # Prepare request parameters
-            params = {
-                "access_key": self.api_key,
-                "query": f"{latitude},{longitude}",
-                "limit": 1,
-                "output": "json",
-            }
-
-            # Make the API request
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(f"{self.base_url}/reverse", params=params)
-                last_request_time = time.time()
-
-                if response.status_code != 200:
-                    logger.error(
-                        f"Reverse geocoding API returned status code {response.status_code}"
-                    )
-                    return None
-
-                # Parse the response
-                data = response.json()
-
-                # Check if we got any results
-                if not data.get("data") or len(data["data"]) == 0:
-                    logger.warning(
-                        f"No reverse geocoding results for: {latitude}, {longitude}"
-                    )
-                    return None
-
-                # Extract address from the first result
-                result = data["data"][0]
-
-                # Format the address components
-                address_components = {
-                    "name": result.get("name"),
-                    "street": result.get("street"),
-                    "number": result.get("number"),
-                    "postal_code": result.get("postal_code"),
-                    "locality": result.get("locality"),
-                    "region": result.get("region"),
-                    "country": result.get("country"),
-                    "formatted_address": result.get("label"),
-                }
-
-                logger.info(
-                    f"Successfully reverse geocoded to: {address_components['formatted_address']}"
-                )
-                return address_components
-
-        except Exception as e:
-            logger.error(
-                f"Error reverse geocoding coordinates '{latitude}, {longitude}': {str(e)}"
-            )
-            return None
-
     def get_default_coordinates(self) -> Tuple[float, float]:
         """
         Return default coordinates when geocoding fails.
@@ -521,19 +398,6 @@ class PositionstackGeocodingService:
 geocoding_service = PositionstackGeocodingService()
 
 
-def get_coordinates_sync(address: str) -> Optional[Tuple[float, float]]:
-    """
-    Synchronous wrapper for get_coordinates.
-
-    Args:
-        address: String address to geocode
-
-    Returns:
-        Tuple of (latitude, longitude) or None if geocoding fails
-    """
-    return geocoding_service.get_coordinates(address)
-
-
 async def get_coordinates_async(address: str) -> Optional[Tuple[float, float]]:
     """
     Asynchronous wrapper for get_coordinates_async.
@@ -0,0 +1,35 @@
+"""
+add index for ride matching queries
+
+Revision ID: b7e4c2a9d1f3
+Revises: 64c6fd146e9f
+Create Date: 2025-04-12T10:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b7e4c2a9d1f3"
+down_revision = "64c6fd146e9f"
+branch_labels = None
+depends_on = None
+
+MATCHABLE_RIDE = "status = 'scheduled' AND available_seats > 0"
+
+
+def upgrade():
+    # Partial composite index covering the candidate ride filter
+    op.create_index(
+        "rides_match_idx",
+        "rides",
+        ["destination_id", "starting_hub_id", "departure_time"],
+        postgresql_where=sa.text(MATCHABLE_RIDE),
+        sqlite_where=sa.text(MATCHABLE_RIDE),
+    )
+
+
+def downgrade():
+    op.drop_index("rides_match_idx", table_name="rides")
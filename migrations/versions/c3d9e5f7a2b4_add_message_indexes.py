@@ -0,0 +1,43 @@
+"""
+add indexes for conversation message lookups
+
+Revision ID: c3d9e5f7a2b4
+Revises: b7e4c2a9d1f3
+Create Date: 2025-04-14T09:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c3d9e5f7a2b4"
+down_revision = "b7e4c2a9d1f3"
+branch_labels = None
+depends_on = None
+
+UNREAD_MESSAGE = "read_at IS NULL"
+
+
+def upgrade():
+    # Latest message per conversation (ORDER BY sent_at DESC per conversation)
+    op.create_index(
+        "ix_msg_conv_sent",
+        "messages",
+        ["conversation_id", sa.text("sent_at DESC")],
+    )
+
+    # Unread messages per conversation from other senders
+    op.create_index(
+        "ix_msg_unread",
+        "messages",
+        ["conversation_id", "sender_id"],
+        postgresql_where=sa.text(UNREAD_MESSAGE),
+        sqlite_where=sa.text(UNREAD_MESSAGE),
+    )
+
+
+def downgrade():
+    op.drop_index("ix_msg_unread", table_name="messages")
+    op.drop_index("ix_msg_conv_sent", table_name="messages")
@@ -0,0 +1,69 @@
+"""
+normalize geocoding cache addresses
+
+Revision ID: e5a7c1d3f9b2
+Revises: c3d9e5f7a2b4
+Create Date: 2025-04-21T09:00:00.000000
+
+"""
+
+import unicodedata
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e5a7c1d3f9b2"
+down_revision = "c3d9e5f7a2b4"
+branch_labels = None
+depends_on = None
+
+
+def _normalize_address(address):
+    # Kept in step with app.services.opencage_geocoding._normalize_address
+    address = unicodedata.normalize("NFKC", address).lower()
+    parts = (" ".join(part.split()) for part in address.split(","))
+    return ", ".join(part for part in parts if part)
+
+
+def upgrade():
+    connection = op.get_bind()
+    geocoding_cache = sa.table(
+        "geocoding_cache",
+        sa.column("id", sa.Integer),
+        sa.column("address", sa.String),
+    )
+
+    # Keep the most recently used row for each normalized address
+    rows = connection.execute(
+        sa.text(
+            "SELECT id, address FROM geocoding_cache "
+            "ORDER BY last_used IS NULL, last_used DESC, id DESC"
+        )
+    ).fetchall()
+    kept = {}
+    duplicates = []
+    for row in rows:
+        key = _normalize_address(row.address)
+        if key in kept:
+            duplicates.append(row.id)
+        else:
+            kept[key] = row
+
+    if duplicates:
+        connection.execute(
+            geocoding_cache.delete().where(geocoding_cache.c.id.in_(duplicates))
+        )
+    for key, row in kept.items():
+        if row.address != key:
+            connection.execute(
+                geocoding_cache.update()
+                .where(geocoding_cache.c.id == row.id)
+                .values(address=key)
+            )
+
+
+def downgrade():
+    # The original spellings are gone; normalized keys remain valid addresses
+    pass
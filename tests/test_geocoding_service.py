@@ -0,0 +1,73 @@
+"""
+Tests for the Nominatim geocoding service.
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services.geocoding_service import (
+    GeocodingService,
+    _get_with_retries,
+    _is_geocodable,
+)
+
+
+@pytest.mark.parametrize(
+    "address",
+    ["", "   ", "abc", "12345", "123 456 7890"],
+)
+def test_is_geocodable_rejects_bad_addresses(address):
+    """Empty, too short, and digits-only addresses are not geocodable."""
+    assert _is_geocodable(address) is False
+
+
+def test_is_geocodable_accepts_real_address():
+    """A normal street address is geocodable."""
+    assert _is_geocodable("Drottninggatan 1, Gothenburg") is True
+
+
+def test_geocode_address_skips_api_for_invalid_address():
+    """Invalid addresses never reach the geocoding API."""
+    service = GeocodingService()
+    address = MagicMock()
+    address.get_geocoding_string.return_value = "1234"
+
+    with patch("app.services.geocoding_service._http_session.get") as mock_get:
+        assert service.geocode_address(address) is False
+        mock_get.assert_not_called()
+
+    assert address.latitude is None
+    assert address.longitude is None
+
+
+def test_get_coordinates_uses_structured_search_params():
+    """Structured address components are sent as separate Nominatim params."""
+    service = GeocodingService()
+    components = {"street": "Drottninggatan 1", "city": "Gothenburg"}
+
+    with patch("app.services.geocoding_service._http_session.get") as mock_get:
+        mock_get.return_value.json.return_value = [{"lat": "57.7", "lon": "11.9"}]
+        assert service.get_coordinates(components) == (57.7, 11.9)
+
+    params = mock_get.call_args.kwargs["params"]
+    assert params["street"] == "Drottninggatan 1"
+    assert params["city"] == "Gothenburg"
+    assert "q" not in params
+
+
+def test_retries_take_a_rate_limit_token_each():
+    """Every retry attempt waits for its own rate limiter token."""
+    throttled = MagicMock(status_code=429, headers={"Retry-After": "2"})
+    ok = MagicMock(status_code=200, headers={})
+
+    with patch(
+        "app.services.geocoding_service._http_session.get",
+        side_effect=[throttled, ok],
+    ), patch("app.services.geocoding_service._rate_limiter") as limiter, patch(
+        "app.services.geocoding_service.time.sleep"
+    ) as sleep:
+        assert _get_with_retries("https://example.test", {"q": "x"}) is ok
+
+    assert limiter.acquire.call_count == 2
+    sleep.assert_called_once_with(2.0)
@@ -17,3 +17,26 @@ def test_find_rides(client, db_session):
     matches = response.json()
     assert isinstance(matches, list)
     assert len(matches) > 0  # Should find Volvo rides
+
+
+def test_match_profile_cache_invalidated_on_update(db_session):
+    from app.models.user import User
+    from app.models.user_matching_preference import UserMatchingPreference
+    from app.services.matching_service import MatchingService
+
+    user = User(email="cache-test@example.com", home_location="POINT(11.9 57.7)")
+    db_session.add(user)
+    db_session.flush()
+
+    service = MatchingService(db_session)
+    assert service._get_match_user(user.id).home_location == "POINT(11.9 57.7)"
+    assert service._get_match_prefs(user.id) is None
+
+    user.home_location = "POINT(12.0 57.8)"
+    db_session.add(
+        UserMatchingPreference(user_id=user.id, max_walking_distance_meters=500)
+    )
+    db_session.flush()
+
+    assert service._get_match_user(user.id).home_location == "POINT(12.0 57.8)"
+    assert service._get_match_prefs(user.id).max_walking_distance_meters == 500
@@ -0,0 +1,90 @@
+"""
+Tests for the messaging WebSocket connection manager.
+"""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock
+
+from fastapi.websockets import WebSocketState
+
+from app.services.messaging_service import ConnectionManager
+
+
+def _connect(manager, user_id):
+    websocket = AsyncMock()
+    websocket.client_state = WebSocketState.CONNECTED
+    asyncio.run(manager.connect(websocket, user_id))
+    return websocket
+
+
+def test_conversation_message_reaches_only_subscribers():
+    """Broadcasts go to the conversation's subscribers, minus the sender."""
+    manager = ConnectionManager()
+    sender, subscriber, other = (_connect(manager, uid) for uid in (1, 2, 3))
+    manager.register_conversation(1, 10)
+    manager.register_conversation(2, 10)
+    manager.register_conversation(3, 20)
+
+    message = {"type": "new_message", "message": {"content": "hi"}}
+    asyncio.run(manager.send_conversation_message(message, 10, exclude_user_id=1))
+
+    sender.send_text.assert_not_called()
+    other.send_text.assert_not_called()
+    subscriber.send_text.assert_awaited_once()
+    assert json.loads(subscriber.send_text.call_args.args[0]) == message
+
+
+def test_unregister_drops_empty_conversation():
+    """The reverse index forgets conversations with no subscribers left."""
+    manager = ConnectionManager()
+    manager.register_conversation(1, 10)
+    manager.unregister_conversation(1, 10)
+
+    assert manager.conversation_sockets == {}
+    assert manager.user_conversations == {}
+
+
+def test_socket_index_follows_connect_and_disconnect():
+    """Sockets opened after registering join the conversation; closed ones leave."""
+    manager = ConnectionManager()
+    manager.register_conversation(2, 10)
+    websocket = _connect(manager, 2)
+    assert manager.conversation_sockets == {10: [(2, websocket)]}
+
+    manager.disconnect(websocket, 2)
+    assert manager.conversation_sockets == {}
+
+
+def test_broadcast_prunes_dead_sockets():
+    """Closed or failing sockets are dropped instead of retried on every send."""
+    manager = ConnectionManager()
+    closed, failing, live = (_connect(manager, uid) for uid in (1, 2, 3))
+    closed.client_state = WebSocketState.DISCONNECTED
+    failing.send_text.side_effect = RuntimeError("connection reset")
+    for uid in (1, 2, 3):
+        manager.register_conversation(uid, 10)
+
+    asyncio.run(manager.send_conversation_message({"type": "ping"}, 10))
+
+    closed.send_text.assert_not_called()
+    live.send_text.assert_awaited_once()
+    assert manager.conversation_sockets == {10: [(3, live)]}
+    assert list(manager.active_connections) == [3]
+
+
+def test_background_broadcast_is_tracked_until_done():
+    """Background broadcasts are delivered and then dropped from the task set."""
+    manager = ConnectionManager()
+    subscriber = _connect(manager, 2)
+    manager.register_conversation(2, 10)
+
+    async def broadcast():
+        await manager.broadcast_conversation_message({"type": "ping"}, 10)
+        assert len(manager._background_tasks) == 1
+        await asyncio.gather(*manager._background_tasks)
+
+    asyncio.run(broadcast())
+
+    subscriber.send_text.assert_awaited_once()
+    assert manager._background_tasks == set()
@@ -0,0 +1,38 @@
+"""
+Tests for the messaging service's send authorization.
+"""
+
+from app.db import configure_relationships
+from app.models.message import Conversation, conversation_participants
+from app.models.user import User
+from app.services.messaging_service import MessagingService, _roster_cache
+
+
+def test_send_check_sees_changes_made_outside_this_process(db_session):
+    """Removals and deactivations apply even while the roster is cached."""
+    configure_relationships()
+    driver = User(email="roster-driver@example.com", first_name="Dana")
+    rider = User(email="roster-rider@example.com", first_name="Robin")
+    conversation = Conversation(participants=[driver, rider])
+    db_session.add(conversation)
+    db_session.flush()
+    _roster_cache.clear()
+
+    service = MessagingService(db_session)
+    roster = service._get_sender_roster(conversation.id, rider.id)
+    assert roster["participants"][rider.id]["first_name"] == "Robin"
+
+    # Core statements fire no ORM events, like a change made by another worker
+    db_session.execute(
+        conversation_participants.delete().where(
+            conversation_participants.c.user_id == rider.id
+        )
+    )
+    assert service._get_sender_roster(conversation.id, rider.id) is None
+
+    db_session.execute(
+        Conversation.__table__.update()
+        .where(Conversation.id == conversation.id)
+        .values(is_active=False)
+    )
+    assert service._get_sender_roster(conversation.id, driver.id) is None
@@ -0,0 +1,47 @@
+"""
+Tests for notification delivery across channels.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from app.db import configure_relationships
+from app.services.notification_service import NotificationService
+
+
+def test_failing_channel_does_not_block_the_others():
+    """A failed SMS is reported, but email and push are still sent."""
+    service = NotificationService(MagicMock())
+    service._send_email = AsyncMock()
+    service._send_sms = AsyncMock(side_effect=RuntimeError("sms gateway down"))
+    service._send_push = AsyncMock()
+    user = MagicMock(id=1, email="rider@example.com", phone_number="+46700000000")
+
+    sent = asyncio.run(service._send_notification(user, "Title", "Body"))
+
+    assert sent is False
+    service._send_email.assert_awaited_once_with("rider@example.com", "Title", "Body")
+    service._send_push.assert_awaited_once_with(1, "Title", "Body", None)
+
+
+def test_notification_setting_cache_invalidated_on_update(db_session):
+    """Changing a user's message settings is seen on the next check."""
+    from app.models.message import UserMessageSettings
+    from app.models.user import User
+
+    configure_relationships()
+    user = User(email="notify-cache@example.com")
+    db_session.add(user)
+    db_session.flush()
+
+    service = NotificationService(db_session)
+    assert service.should_notify_user(user.id) is True
+
+    settings = UserMessageSettings(user_id=user.id, notifications_enabled=False)
+    db_session.add(settings)
+    db_session.flush()
+    assert service.should_notify_user(user.id) is False
+
+    settings.notifications_enabled = True
+    db_session.flush()
+    assert service.should_notify_user(user.id) is True
@@ -0,0 +1,246 @@
+"""
+Tests for the OpenCage geocoding service.
+"""
+
+import asyncio
+import time
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+
+from app.db import configure_relationships
+from app.models.geocoding_cache import GeocodingCache
+from app.services import opencage_geocoding
+from app.services.opencage_geocoding import (
+    CircuitBreaker,
+    CircuitOpenError,
+    OpenCageGeocodingService,
+    TokenBucket,
+)
+
+
+@pytest.fixture(autouse=True, scope="module")
+def configured_mappers():
+    configure_relationships()
+
+
+@pytest.fixture(autouse=True)
+def empty_memory_cache():
+    opencage_geocoding._memory_cache.clear()
+    yield
+    opencage_geocoding._memory_cache.clear()
+
+
+def test_token_bucket_queues_callers_beyond_burst():
+    """Callers past the burst wait one interval more than the caller before."""
+    bucket = TokenBucket(rate=2.0, capacity=2)
+
+    delays = [bucket._reserve() for _ in range(4)]
+
+    assert delays[:2] == [0.0, 0.0]
+    assert 0.49 < delays[2] <= 0.5
+    assert 0.99 < delays[3] <= 1.0
+
+
+def test_batch_geocode_sends_requests_through_shared_client(db_session, monkeypatch):
+    """Uncached addresses are geocoded once per spelling-insensitive key."""
+    requested = []
+
+    def handler(request):
+        requested.append(request.url.params["q"])
+        geometry = {"lat": 57.7, "lng": 11.97}
+        return httpx.Response(
+            200, json={"total_results": 1, "results": [{"geometry": geometry}]}
+        )
+
+    monkeypatch.setattr(
+        opencage_geocoding, "_rate_limiter", TokenBucket(rate=1000.0, capacity=10)
+    )
+    service = OpenCageGeocodingService(db=db_session, api_key="test-key")
+
+    async def geocode():
+        opencage_geocoding._async_client = httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        )
+        try:
+            return await service.batch_geocode(
+                ["Lindholmen 1", "Avenyn 2", " lindholmen 1 "]
+            )
+        finally:
+            await opencage_geocoding.close_async_client()
+
+    results = asyncio.run(geocode())
+
+    assert sorted(requested) == ["Avenyn 2", "Lindholmen 1"]
+    assert results == {
+        "Lindholmen 1": (57.7, 11.97),
+        "Avenyn 2": (57.7, 11.97),
+        " lindholmen 1 ": (57.7, 11.97),
+    }
+    saved = db_session.query(GeocodingCache.address).order_by(GeocodingCache.address)
+    assert [row.address for row in saved] == ["avenyn 2", "lindholmen 1"]
+
+
+def test_memory_cache_answers_repeat_lookups_without_database(db_session):
+    """Saved coordinates are served from memory, whatever the spelling's spacing."""
+    service = OpenCageGeocodingService(db=db_session, api_key="test-key")
+    service._save_to_cache("Avenyn 2, Göteborg", (57.7, 11.97))
+
+    assert service._get_from_cache(" avenyn 2 ,göteborg") == (57.7, 11.97)
+    assert service._get_many_from_cache(["Avenyn 2, Göteborg", "Unknown 9"]) == {
+        "Avenyn 2, Göteborg": (57.7, 11.97)
+    }
+
+
+def test_cache_hits_defer_last_used_until_flush(db_session, monkeypatch):
+    """Hits are only recorded until the flush interval has passed."""
+    db_session.add(
+        GeocodingCache(
+            address="avenyn 2", latitude=57.7, longitude=11.97, coordinates="57.7,11.97"
+        )
+    )
+    db_session.flush()
+    monkeypatch.setattr(opencage_geocoding, "_pending_last_used", set())
+    monkeypatch.setattr(opencage_geocoding, "_last_used_flushed_at", time.monotonic())
+    service = OpenCageGeocodingService(db=db_session, api_key="test-key")
+
+    assert service._get_from_cache("Avenyn 2") == (57.7, 11.97)
+    assert opencage_geocoding._pending_last_used == {"avenyn 2"}
+
+    opencage_geocoding._memory_cache.clear()
+    monkeypatch.setattr(opencage_geocoding, "_last_used_flushed_at", 0.0)
+    assert service._get_from_cache("Avenyn 2") == (57.7, 11.97)
+    assert opencage_geocoding._pending_last_used == set()
+
+
+def test_async_requests_retry_then_open_the_circuit(monkeypatch):
+    """Gateway errors are retried; repeated failures stop further calls."""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503)
+
+    monkeypatch.setattr(
+        opencage_geocoding, "_rate_limiter", TokenBucket(rate=1000.0, capacity=10)
+    )
+    monkeypatch.setattr(opencage_geocoding, "RETRY_BACKOFF_SECONDS", 0.0)
+    monkeypatch.setattr(
+        opencage_geocoding, "_circuit_breaker", CircuitBreaker(2, reset_timeout=60)
+    )
+    service = OpenCageGeocodingService(api_key="test-key")
+
+    async def geocode_all():
+        opencage_geocoding._async_client = httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        )
+        try:
+            first = await service.get_coordinates_async("Avenyn 2", use_cache=False)
+            second = await service.get_coordinates_async("Avenyn 3", use_cache=False)
+            third = await service.get_coordinates_async("Avenyn 4", use_cache=False)
+            return first, second, third
+        finally:
+            await opencage_geocoding.close_async_client()
+
+    assert asyncio.run(geocode_all()) == (None, None, None)
+    assert len(calls) == 2 * opencage_geocoding.REQUEST_ATTEMPTS
+
+
+def test_sync_retries_take_a_rate_limit_token_each(monkeypatch):
+    """Every sync attempt, retries included, waits for its own token."""
+    tokens = []
+    limiter = TokenBucket(rate=1000.0, capacity=10)
+    monkeypatch.setattr(limiter, "acquire_sync", lambda: tokens.append(1))
+    monkeypatch.setattr(opencage_geocoding, "_rate_limiter", limiter)
+    monkeypatch.setattr(opencage_geocoding, "RETRY_BACKOFF_SECONDS", 0.0)
+    monkeypatch.setattr(
+        opencage_geocoding, "_circuit_breaker", CircuitBreaker(10, reset_timeout=60)
+    )
+    statuses = iter([503, 429, 200])
+    monkeypatch.setattr(
+        opencage_geocoding._session,
+        "get",
+        lambda *args, **kwargs: MagicMock(status_code=next(statuses), headers={}),
+    )
+
+    response = opencage_geocoding._send_sync("https://example.test")
+
+    assert response.status_code == 200
+    assert len(tokens) == 3
+
+
+def test_retries_wait_at_least_retry_after(monkeypatch):
+    """A 429 with Retry-After waits that long before the next attempt."""
+    monkeypatch.setattr(
+        opencage_geocoding, "_rate_limiter", TokenBucket(rate=1000.0, capacity=10)
+    )
+    monkeypatch.setattr(
+        opencage_geocoding, "_circuit_breaker", CircuitBreaker(10, reset_timeout=60)
+    )
+    responses = iter(
+        [MagicMock(status_code=429, headers={"Retry-After": "2"})]
+        + [MagicMock(status_code=200, headers={})]
+    )
+    monkeypatch.setattr(
+        opencage_geocoding._session, "get", lambda *args, **kwargs: next(responses)
+    )
+    sleeps = []
+    monkeypatch.setattr(opencage_geocoding.time, "sleep", sleeps.append)
+
+    response = opencage_geocoding._send_sync("https://example.test")
+
+    assert response.status_code == 200
+    assert sleeps == [2.0]
+
+
+def test_async_retries_wait_at_least_retry_after(monkeypatch):
+    """The async path honours Retry-After the same way."""
+    statuses = iter([429, 200])
+
+    def handler(request):
+        status = next(statuses)
+        headers = {"Retry-After": "2"} if status == 429 else {}
+        return httpx.Response(status, headers=headers)
+
+    monkeypatch.setattr(
+        opencage_geocoding, "_rate_limiter", TokenBucket(rate=1000.0, capacity=10)
+    )
+    monkeypatch.setattr(
+        opencage_geocoding, "_circuit_breaker", CircuitBreaker(10, reset_timeout=60)
+    )
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(opencage_geocoding.asyncio, "sleep", fake_sleep)
+
+    async def send():
+        opencage_geocoding._async_client = httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        )
+        try:
+            return await opencage_geocoding._send("https://example.test")
+        finally:
+            await opencage_geocoding.close_async_client()
+
+    assert asyncio.run(send()).status_code == 200
+    assert sleeps == [2.0]
+
+
+def test_half_open_circuit_lets_one_trial_call_through():
+    """After the cool-down only one caller gets through until it reports."""
+    breaker = CircuitBreaker(1, reset_timeout=60)
+    breaker.record(success=False)
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    breaker.opened_at -= 61
+    breaker.check()
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    breaker.record(success=True)
+    breaker.check()
+    assert breaker.opened_at is None